@@ -3,6 +3,7 @@ Provided with a set of valid words and given an input string, generate all valid
 """
 
 import collections
+import random
 
 class AnagramServer(object):
     def __init__(self, valid_words=None):
@@ -46,6 +47,24 @@ class AnagramServer(object):
             self._cached_anagrams[key].append(word)
 
 
+def benchmark_workloads():
+    """Return (name, make_input, run) workloads for the shared benchmark runner.
+    """
+    rand = random.Random(0)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set(''.join(rand.choice(letters) for _ in range(rand.randint(3, 12)))
+                for _ in range(100000))
+    # few distinct letters produce many anagrams per key
+    anagram_heavy = set(''.join(rand.choice('aeinrst') for _ in range(7)) for _ in range(100000))
+    queries = sorted(words)[:20000]
+    return [
+        ('init/random_words', lambda: words, AnagramServer),
+        ('init/anagram_heavy', lambda: anagram_heavy, AnagramServer),
+        ('get_anagrams/random_words', lambda: AnagramServer(words),
+         lambda server: [server.get_anagrams(word) for word in queries]),
+    ]
+
+
         
 if __name__ == '__main__':
     import unittest
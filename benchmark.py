@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Shared benchmark and profiling harness for the algorithm modules.
+
+Each module listed in MODULE_NAMES defines a benchmark_workloads function returning a list
+of (name, make_input, run) tuples. make_input builds a fresh input and is not measured;
+run is called with that input and is measured. Every workload is run with warmup and
+repeats for wall time, once under tracemalloc for peak allocations, and optionally once
+under cProfile for hot spots. Results can be saved as JSON and compared with a saved
+baseline to catch performance regressions.
+"""
+
+import collections
+import cProfile
+import importlib
+import json
+import platform
+import pstats
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+
+# Modules searched for benchmark_workloads
+MODULE_NAMES = ('anagrams', 'overlapping_rectangles', 'palindrome', 'permute', 'qsort')
+
+Workload = collections.namedtuple('Workload', 'module name make_input run')
+
+
+def discover_workloads(module_names=MODULE_NAMES, name_filter=None):
+    """Collect workloads defined by provided modules.
+
+    :rtype: [Workload]
+
+    :type module_names: [str]
+    :arg module_names: names of modules to import; modules without benchmark_workloads
+        are skipped
+
+    :type name_filter: str
+    :arg name_filter: optional substring that 'module.name' of workload must contain
+
+    """
+    workloads = []
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        get_workloads = getattr(module, 'benchmark_workloads', None)
+        if get_workloads is None:
+            continue
+        for name, make_input, run in get_workloads():
+            workload = Workload(module_name, name, make_input, run)
+            if name_filter is None or name_filter in full_name(workload):
+                workloads.append(workload)
+    return workloads
+
+
+def full_name(workload):
+    return '{0}.{1}'.format(workload.module, workload.name)
+
+
+def run_workload(workload, warmup=1, repeat=5, measure_memory=True, profile_top=0):
+    """Measure one workload.
+
+    :rtype: dict
+    :return: JSON-serializable result with wall times in seconds, peak traced allocation
+        in bytes if measure_memory, and hot spots if profile_top
+
+    :type warmup: int
+    :arg warmup: number of unmeasured runs before timing
+
+    :type repeat: int
+    :arg repeat: number of timed runs
+
+    :type measure_memory: bool
+    :arg measure_memory: if True, make an extra run under tracemalloc
+
+    :type profile_top: int
+    :arg profile_top: number of functions with most internal time to report from an extra
+        run under cProfile; 0 to skip profiling
+
+    """
+    for _ in range(warmup):
+        workload.run(workload.make_input())
+
+    times = []
+    for _ in range(repeat):
+        data = workload.make_input()
+        start = timeit.default_timer()
+        workload.run(data)
+        times.append(timeit.default_timer() - start)
+        del data
+
+    result = {'name': full_name(workload),
+              'repeat': repeat,
+              'min': min(times),
+              'median': statistics.median(times),
+              'mean': statistics.mean(times)}
+    if measure_memory:
+        result['peak_bytes'] = _measure_peak_memory(workload)
+    if profile_top:
+        result['hot_spots'] = _profile(workload, profile_top)
+    return result
+
+
+def run_all(workloads, on_result=None, **kwargs):
+    """Measure workloads; other keyword arguments are passed to run_workload.
+
+    :rtype: dict
+    :return: JSON-serializable report with environment details and list of results
+
+    :type on_result: callable
+    :arg on_result: optional function called with each result as soon as it is measured
+
+    """
+    results = []
+    for workload in workloads:
+        result = run_workload(workload, **kwargs)
+        if on_result is not None:
+            on_result(result)
+        results.append(result)
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results}
+
+
+def compare(report, baseline, threshold=0.2):
+    """Find workloads that got slower than in baseline report.
+
+    Minimum times are compared, as they are least affected by other load on the machine.
+    Workloads missing from either report are ignored.
+
+    :rtype: [(str, float, float)]
+    :return: list of (workload name, baseline time, current time) for regressions
+
+    :type report: dict
+    :type baseline: dict
+    :arg report, baseline: reports returned by run_all
+
+    :type threshold: float
+    :arg threshold: fraction by which time may grow before it counts as regression
+
+    """
+    baseline_times = dict((result['name'], result['min']) for result in baseline['results'])
+    regressions = []
+    for result in report['results']:
+        baseline_time = baseline_times.get(result['name'])
+        if baseline_time is not None and result['min'] > baseline_time * (1 + threshold):
+            regressions.append((result['name'], baseline_time, result['min']))
+    return regressions
+
+
+def _measure_peak_memory(workload):
+    """Return peak bytes allocated while running workload, beyond its input.
+    """
+    data = workload.make_input()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        workload.run(data)
+        return tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+
+
+def _profile(workload, top):
+    """Return functions with most internal time during one run of workload.
+    """
+    data = workload.make_input()
+    profiler = cProfile.Profile()
+    profiler.runcall(workload.run, data)
+    stats = pstats.Stats(profiler).stats
+    hot_spots = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in sorted(
+            stats.items(), key=lambda item: item[1][2], reverse=True)[:top]:
+        hot_spots.append({'function': '{0}:{1}({2})'.format(filename, line, func),
+                          'calls': calls,
+                          'tottime': tottime,
+                          'cumtime': cumtime})
+    return hot_spots
+
+
+if __name__ == '__main__':
+    # command-line driver for running workloads and checking for regressions
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the algorithm modules and compare with a baseline',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-m', '--module', action='append', choices=MODULE_NAMES,
+                        help='module to benchmark; may be repeated (default: all)')
+    parser.add_argument('-k', '--filter', help='only run workloads whose name contains this')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured runs per workload')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per workload')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc run')
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='report N hot spots per workload from a cProfile run')
+    parser.add_argument('-o', '--output', help='write JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fractional slowdown versus baseline that counts as regression')
+    args = parser.parse_args()
+
+    def print_result(result):
+        memory = '{0:>12,d}B'.format(result['peak_bytes']) if 'peak_bytes' in result else ''
+        print('{0:<55}{1:>10.4f}s{2:>10.4f}s{3}'.format(
+            result['name'], result['min'], result['median'], memory))
+        for hot_spot in result.get('hot_spots', []):
+            print('    {0:>10.4f}s {1:>9,d} {2}'.format(
+                hot_spot['tottime'], hot_spot['calls'], hot_spot['function']))
+
+    workloads = discover_workloads(args.module or MODULE_NAMES, name_filter=args.filter)
+    report = run_all(workloads, on_result=print_result, warmup=args.warmup, repeat=args.repeat,
+                     measure_memory=not args.no_memory, profile_top=args.profile)
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+        regressions = compare(report, baseline, threshold=args.threshold)
+        for name, baseline_time, current_time in regressions:
+            print('REGRESSION {0}: {1:.4f}s -> {2:.4f}s ({3:+.0%})'.format(
+                name, baseline_time, current_time, current_time / baseline_time - 1))
+        if regressions:
+            sys.exit(1)
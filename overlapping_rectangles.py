@@ -2,13 +2,29 @@
 # -*- coding: utf-8 -*-
 
 """Determine if rectangles overlap.
+
+Rectangles overlap only if their interiors intersect; rectangles that merely share an
+edge or corner do not overlap. RectangleSet finds every overlapping pair among many
+rectangles with a sweep line, and RectangleGrid indexes a changing collection of
+rectangles for fast overlap and point queries. RectangleArray stores large batches of
+rectangles as numpy columns for vectorized checks.
 """
 
 import collections
+import itertools
+import math
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 Point = collections.namedtuple('Point', 'x y')
 
 class Rectangle(object):
+    __slots__ = ('min_x', 'max_x', 'min_y', 'max_y')
+
     def __init__(self, min_x=None, max_x=None, min_y=None, max_y=None):
         for coord in (min_x, max_x, min_y, max_y):
             if coord is None:
@@ -31,6 +47,484 @@ class Rectangle(object):
             return False
         return True
 
+    def contains_point(self, point):
+        """Return True if point lies inside rectangle.
+
+        Rectangles are half-open: points on the min_x and min_y edges are inside, points
+        on the max_x and max_y edges are not, so a point on an edge shared by adjacent
+        rectangles is inside exactly one of them.
+
+        :type point: Point
+        """
+        return self.min_x <= point.x < self.max_x and self.min_y <= point.y < self.max_y
+
+
+class RectangleSet(object):
+    def __init__(self, rectangles=None):
+        """Initialize RectangleSet with provided rectangles.
+
+        More rectangles can be added later using the add method.
+
+        :type rectangles: [Rectangle]
+        """
+        self._rectangles = []
+        for rect in rectangles or []:
+            self.add(rect)
+
+    def __len__(self):
+        return len(self._rectangles)
+
+    def __iter__(self):
+        return iter(self._rectangles)
+
+    def __getitem__(self, idx):
+        return self._rectangles[idx]
+
+    def add(self, rect):
+        """Add rectangle to set.
+
+        :rtype: int
+        :return: index of rectangle, as used in overlapping_pairs
+
+        :type rect: Rectangle
+        """
+        self._rectangles.append(rect)
+        return len(self._rectangles) - 1
+
+    def overlapping_pairs(self):
+        """Find every pair of overlapping rectangles in O(n log n + k) time.
+
+        A vertical line sweeps across x. When it reaches a rectangle's min_x, the
+        rectangle's y-interval is checked against the y-intervals of the rectangles the
+        line is currently crossing, and then added to them; when the line reaches max_x,
+        the interval is removed. Removals are processed before additions at the same x, so
+        rectangles that only touch along a vertical edge are not reported.
+
+        :rtype: [(int, int)]
+        :return: list of (i, j) index pairs of overlapping rectangles, with i < j
+
+        """
+        rects = self._rectangles
+        events = []
+        for idx, rect in enumerate(rects):
+            events.append((rect.min_x, 1, idx))
+            events.append((rect.max_x, 0, idx))
+        events.sort()
+
+        active = _IntervalIndex(
+            [rect.min_y for rect in rects] + [rect.max_y for rect in rects])
+        pairs = []
+        for _, is_start, idx in events:
+            rect = rects[idx]
+            if is_start:
+                for other_idx in active.overlapping(rect.min_y, rect.max_y):
+                    pairs.append((other_idx, idx) if other_idx < idx else (idx, other_idx))
+                active.insert(idx, rect.min_y, rect.max_y)
+            else:
+                active.remove(idx, rect.min_y, rect.max_y)
+        return pairs
+
+
+class _IntervalIndex(object):
+    def __init__(self, coordinates):
+        """Initialize empty index of intervals whose endpoints are among coordinates.
+
+        This is a segment tree over the elementary slots between consecutive distinct
+        coordinates. Each interval is stored in two ways: in the O(log n) nodes that
+        exactly cover it, for stabbing queries, and in the leaf for its start slot, with
+        counts of stored starts kept up the tree so that empty subtrees can be skipped.
+
+        :type coordinates: [number]
+        """
+        self._coords = sorted(set(coordinates))
+        self._slot = dict((coord, i) for i, coord in enumerate(self._coords))
+        self._size = 1
+        while self._size < len(self._coords):
+            self._size *= 2
+        # map node to {interval id: interval start} for intervals covering node
+        self._covering = collections.defaultdict(dict)
+        # map leaf node to set of ids of intervals starting in leaf's slot
+        self._starting = collections.defaultdict(set)
+        self._start_counts = [0] * (2 * self._size)
+
+    def insert(self, interval_id, lo, hi):
+        for node in self._cover_nodes(lo, hi):
+            self._covering[node][interval_id] = lo
+        leaf = self._size + self._slot[lo]
+        self._starting[leaf].add(interval_id)
+        self._add_start_count(leaf, 1)
+
+    def remove(self, interval_id, lo, hi):
+        for node in self._cover_nodes(lo, hi):
+            covering = self._covering[node]
+            del covering[interval_id]
+            if not covering:
+                del self._covering[node]
+        leaf = self._size + self._slot[lo]
+        self._starting[leaf].discard(interval_id)
+        if not self._starting[leaf]:
+            del self._starting[leaf]
+        self._add_start_count(leaf, -1)
+
+    def overlapping(self, lo, hi):
+        """Generate ids of stored intervals overlapping open interval (lo, hi).
+
+        Stored intervals that start before lo overlap if they cover the slot starting at
+        lo; stored intervals that start at or after lo overlap if they start before hi.
+        """
+        node = self._size + self._slot[lo]
+        while node:
+            for interval_id, start in self._covering.get(node, {}).items():
+                if start < lo:
+                    yield interval_id
+            node //= 2
+
+        left = self._size + self._slot[lo]
+        right = self._size + self._slot[hi]
+        while left < right:
+            if left & 1:
+                for interval_id in self._starting_in_subtree(left):
+                    yield interval_id
+                left += 1
+            if right & 1:
+                right -= 1
+                for interval_id in self._starting_in_subtree(right):
+                    yield interval_id
+            left //= 2
+            right //= 2
+
+    def _cover_nodes(self, lo, hi):
+        """Return nodes exactly covering the slots from lo up to hi.
+        """
+        nodes = []
+        left = self._size + self._slot[lo]
+        right = self._size + self._slot[hi]
+        while left < right:
+            if left & 1:
+                nodes.append(left)
+                left += 1
+            if right & 1:
+                right -= 1
+                nodes.append(right)
+            left //= 2
+            right //= 2
+        return nodes
+
+    def _add_start_count(self, leaf, increment):
+        node = leaf
+        while node:
+            self._start_counts[node] += increment
+            node //= 2
+
+    def _starting_in_subtree(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if not self._start_counts[node]:
+                continue
+            if node >= self._size:
+                for interval_id in self._starting[node]:
+                    yield interval_id
+            else:
+                stack.append(2 * node)
+                stack.append(2 * node + 1)
+
+
+class RectangleGrid(object):
+    def __init__(self, cell_size):
+        """Initialize empty grid index of rectangles.
+
+        The plane is divided into square cells and each rectangle is recorded in every
+        cell it covers, so a query only examines rectangles sharing a cell with it. Insert,
+        remove and query all take time proportional to the number of cells a rectangle
+        covers plus the number of rectangles found there; a cell size near the typical
+        rectangle size keeps both small.
+
+        :type cell_size: number
+        :arg cell_size: width and height of each grid cell
+        """
+        if not cell_size > 0:
+            raise ValueError("cell_size must be > 0")
+        self.cell_size = cell_size
+        # map rectangle id to rectangle
+        self._rectangles = {}
+        # map (column, row) to set of ids of rectangles covering cell
+        self._cells = collections.defaultdict(set)
+        self._next_id = itertools.count()
+
+    def __len__(self):
+        return len(self._rectangles)
+
+    def __getitem__(self, rect_id):
+        return self._rectangles[rect_id]
+
+    def insert(self, rect):
+        """Add rectangle to index.
+
+        :rtype: int
+        :return: id of rectangle, for use with remove
+
+        :type rect: Rectangle
+        """
+        rect_id = next(self._next_id)
+        self._rectangles[rect_id] = rect
+        for cell in self._cells_covering(rect):
+            self._cells[cell].add(rect_id)
+        return rect_id
+
+    def remove(self, rect_id):
+        """Remove rectangle from index.
+
+        :raise: KeyError if no rectangle has provided id
+
+        :type rect_id: int
+        """
+        rect = self._rectangles.pop(rect_id)
+        for cell in self._cells_covering(rect):
+            cell_ids = self._cells[cell]
+            cell_ids.discard(rect_id)
+            if not cell_ids:
+                del self._cells[cell]
+
+    def overlapping(self, rect):
+        """Return ids of indexed rectangles that overlap provided rectangle.
+
+        :rtype: set(int)
+
+        :type rect: Rectangle
+        """
+        found = set()
+        checked = set()
+        for cell in self._cells_covering(rect):
+            for rect_id in self._cells.get(cell, ()):
+                if rect_id not in checked:
+                    checked.add(rect_id)
+                    if rect.overlaps_rectangle(self._rectangles[rect_id]):
+                        found.add(rect_id)
+        return found
+
+    def containing(self, point):
+        """Return ids of indexed rectangles containing provided point.
+
+        :rtype: set(int)
+
+        :type point: Point
+        """
+        cell = (int(math.floor(point.x / self.cell_size)),
+                int(math.floor(point.y / self.cell_size)))
+        return set(rect_id for rect_id in self._cells.get(cell, ())
+                   if self._rectangles[rect_id].contains_point(point))
+
+    def _cells_covering(self, rect):
+        """Generate (column, row) of every cell overlapping half-open rectangle.
+        """
+        size = self.cell_size
+        columns = range(int(math.floor(rect.min_x / size)), int(math.ceil(rect.max_x / size)))
+        rows = range(int(math.floor(rect.min_y / size)), int(math.ceil(rect.max_y / size)))
+        return itertools.product(columns, rows)
+
+
+class RectangleArray(object):
+    def __init__(self, min_x, max_x, min_y, max_y, dtype=None):
+        """Initialize batch of rectangles from four equal-length sequences of coordinates.
+
+        Coordinates are held in four contiguous numpy arrays, one per coordinate, and
+        are validated together with the same rules as Rectangle.
+
+        :raise: ImportError if numpy is not installed
+        :raise: ValueError if arrays differ in length or any rectangle is invalid
+
+        :type min_x: sequence of numbers
+        :type max_x: sequence of numbers
+        :type min_y: sequence of numbers
+        :type max_y: sequence of numbers
+
+        :type dtype: numpy.dtype
+        :arg dtype: optional type of coordinate arrays; defaults to type inferred by numpy
+
+        """
+        if numpy is None:
+            raise ImportError("RectangleArray requires numpy")
+        self.min_x, self.max_x, self.min_y, self.max_y = [
+            numpy.ascontiguousarray(coords, dtype=dtype) for coords in (min_x, max_x, min_y, max_y)]
+        for coords in (self.min_x, self.max_x, self.min_y, self.max_y):
+            if coords.ndim != 1 or len(coords) != len(self.min_x):
+                raise ValueError("All coordinates must be 1-D arrays of the same length")
+        # comparisons are negated so NaN coordinates are rejected too
+        if not (self.min_x < self.max_x).all():
+            raise ValueError("min_x must be < max_x")
+        if not (self.min_y < self.max_y).all():
+            raise ValueError("min_y must be < max_y")
+
+    @classmethod
+    def from_rectangles(cls, rectangles, dtype=None):
+        """Return RectangleArray holding coordinates of provided rectangles.
+
+        :type rectangles: [Rectangle]
+        """
+        rectangles = list(rectangles)
+        return cls([r.min_x for r in rectangles], [r.max_x for r in rectangles],
+                   [r.min_y for r in rectangles], [r.max_y for r in rectangles], dtype=dtype)
+
+    def to_rectangles(self):
+        """Return list of Rectangle objects with same coordinates.
+        """
+        return [Rectangle(min_x=min_x, max_x=max_x, min_y=min_y, max_y=max_y)
+                for min_x, max_x, min_y, max_y in zip(self.min_x.tolist(), self.max_x.tolist(),
+                                                      self.min_y.tolist(), self.max_y.tolist())]
+
+    def __len__(self):
+        return len(self.min_x)
+
+    def __getitem__(self, idx):
+        return Rectangle(min_x=self.min_x[idx].item(), max_x=self.max_x[idx].item(),
+                         min_y=self.min_y[idx].item(), max_y=self.max_y[idx].item())
+
+    def overlaps_mask(self, rect):
+        """Return boolean array that is True for each rectangle overlapping rect.
+
+        :type rect: Rectangle
+        """
+        return ((self.min_x < rect.max_x) & (self.max_x > rect.min_x) &
+                (self.min_y < rect.max_y) & (self.max_y > rect.min_y))
+
+    def intersection_areas(self, rect):
+        """Return array of area of intersection of each rectangle with rect; 0 if none.
+
+        :type rect: Rectangle
+        """
+        widths = numpy.minimum(self.max_x, rect.max_x) - numpy.maximum(self.min_x, rect.min_x)
+        heights = numpy.minimum(self.max_y, rect.max_y) - numpy.maximum(self.min_y, rect.min_y)
+        return numpy.clip(widths, 0, None) * numpy.clip(heights, 0, None)
+
+    def overlap_matrix(self, other=None, block_size=1024):
+        """Return boolean matrix that is True where rectangle i overlaps other rectangle j.
+
+        The matrix is filled in blocks of block_size rows so that temporary arrays stay
+        at block_size * len(other) elements however large the batches are.
+
+        :rtype: numpy.ndarray
+        :return: boolean array of shape (len(self), len(other))
+
+        :type other: RectangleArray
+        :arg other: optional batch to compare against; defaults to self, in which case
+            the diagonal is True
+
+        :type block_size: int
+        :arg block_size: number of rows to compute at once
+
+        """
+        other = self if other is None else other
+        matrix = numpy.empty((len(self), len(other)), dtype=bool)
+        for start in range(0, len(self), block_size):
+            end = min(start + block_size, len(self))
+            block = matrix[start:end]
+            numpy.less(self.min_x[start:end, None], other.max_x[None, :], out=block)
+            block &= self.max_x[start:end, None] > other.min_x[None, :]
+            block &= self.min_y[start:end, None] < other.max_y[None, :]
+            block &= self.max_y[start:end, None] > other.min_y[None, :]
+        return matrix
+
+
+def naive_overlapping_pairs(rectangles):
+    """Find every pair of overlapping rectangles by checking each pair in turn.
+
+    :rtype: [(int, int)]
+    :return: list of (i, j) index pairs of overlapping rectangles, with i < j
+
+    :type rectangles: [Rectangle]
+    """
+    pairs = []
+    for i, rect in enumerate(rectangles):
+        for j in range(i+1, len(rectangles)):
+            if rect.overlaps_rectangle(rectangles[j]):
+                pairs.append((i, j))
+    return pairs
+
+
+def make_benchmark_rectangles(count, extent=1000, max_side=20, seed=0):
+    """Return list of count random rectangles with integer coordinates.
+
+    Integer coordinates make touching edges common, exercising the strict-overlap rule.
+    """
+    rand = random.Random(seed)
+    rects = []
+    for _ in range(count):
+        min_x = rand.randint(0, extent)
+        min_y = rand.randint(0, extent)
+        rects.append(Rectangle(min_x=min_x, max_x=min_x + rand.randint(1, max_side),
+                               min_y=min_y, max_y=min_y + rand.randint(1, max_side)))
+    return rects
+
+
+def make_clustered_rectangles(count, extent=1000, max_side=20, clusters=10, seed=0):
+    """Return list of count random rectangles gathered around a few cluster centers.
+    """
+    rand = random.Random(seed)
+    centers = [(rand.uniform(0, extent), rand.uniform(0, extent)) for _ in range(clusters)]
+    spread = extent / (4.0 * clusters)
+    rects = []
+    for _ in range(count):
+        center_x, center_y = rand.choice(centers)
+        min_x = rand.gauss(center_x, spread)
+        min_y = rand.gauss(center_y, spread)
+        rects.append(Rectangle(min_x=min_x, max_x=min_x + rand.uniform(1, max_side),
+                               min_y=min_y, max_y=min_y + rand.uniform(1, max_side)))
+    return rects
+
+
+def benchmark_workloads():
+    """Return (name, make_input, run) workloads for the shared benchmark runner.
+    """
+    uniform = make_benchmark_rectangles(5000, extent=1400)
+    clustered = make_clustered_rectangles(5000, extent=1400)
+    workloads = [
+        ('overlapping_pairs/uniform', lambda: RectangleSet(uniform),
+         RectangleSet.overlapping_pairs),
+        ('overlapping_pairs/clustered', lambda: RectangleSet(clustered),
+         RectangleSet.overlapping_pairs),
+        ('overlapping_pairs/uniform_1000', lambda: RectangleSet(uniform[:1000]),
+         RectangleSet.overlapping_pairs),
+        ('naive_overlapping_pairs/uniform', lambda: uniform[:1000], naive_overlapping_pairs),
+    ]
+    for distribution, rects in (('uniform', uniform), ('clustered', clustered)):
+        workloads.extend([
+            ('grid_insert/' + distribution, lambda: RectangleGrid(20),
+             lambda grid, rects=rects: [grid.insert(rect) for rect in rects]),
+            ('grid_overlapping/' + distribution, lambda rects=rects: _filled_grid(rects),
+             lambda grid, rects=rects: [grid.overlapping(rect) for rect in rects]),
+            ('grid_containing/' + distribution, lambda rects=rects: _filled_grid(rects),
+             lambda grid, rects=rects: [grid.containing(Point(rect.min_x, rect.min_y))
+                                        for rect in rects]),
+            # RectangleGrid numbers rectangles from 0 in order of insertion
+            ('grid_remove/' + distribution, lambda rects=rects: _filled_grid(rects),
+             lambda grid: [grid.remove(rect_id) for rect_id in range(len(grid))]),
+        ])
+    # Rectangle objects against numpy columns, for peak memory and one-against-many checks
+    queries = uniform[:100]
+    workloads.extend([
+        ('rectangles/5000', lambda: 5000,
+         lambda count: make_benchmark_rectangles(count, extent=1400)),
+        ('overlap_query/Rectangle', lambda: uniform,
+         lambda rects: [[r for r in rects if r.overlaps_rectangle(q)] for q in queries]),
+    ])
+    if numpy is not None:
+        workloads.extend([
+            ('rectangle_array/5000', lambda: uniform, RectangleArray.from_rectangles),
+            ('overlap_query/RectangleArray', lambda: RectangleArray.from_rectangles(uniform),
+             lambda batch: [batch.overlaps_mask(q).nonzero()[0] for q in queries]),
+            ('overlap_matrix/uniform', lambda: RectangleArray.from_rectangles(uniform[:2000]),
+             RectangleArray.overlap_matrix),
+        ])
+    return workloads
+
+
+def _filled_grid(rects, cell_size=20):
+    grid = RectangleGrid(cell_size)
+    for rect in rects:
+        grid.insert(rect)
+    return grid
+
 
 if __name__ == '__main__':
     import unittest
@@ -95,5 +589,157 @@ if __name__ == '__main__':
             self.assertTrue(self.rect.overlaps_rectangle(other_rect))
             self.assertTrue(other_rect.overlaps_rectangle(self.rect))
 
+    class TestRectangleSet(unittest.TestCase):
+        def test_overlapping_pairs(self):
+            rect_set = RectangleSet([
+                Rectangle(min_x=5, max_x=15, min_y=5, max_y=10),
+                Rectangle(min_x=7, max_x=20, min_y=1, max_y=7),
+                Rectangle(min_x=20, max_x=24, min_y=7, max_y=15),
+                Rectangle(min_x=1, max_x=16, min_y=1, max_y=12)])
+            self.assertEqual([(0, 1), (0, 3), (1, 3)], sorted(rect_set.overlapping_pairs()))
+
+        def test_overlapping_pairs__touching(self):
+            """Verify that rectangles sharing an edge or corner are not reported.
+            """
+            rect_set = RectangleSet([
+                Rectangle(min_x=0, max_x=10, min_y=0, max_y=10),
+                Rectangle(min_x=10, max_x=20, min_y=0, max_y=10),
+                Rectangle(min_x=0, max_x=10, min_y=10, max_y=20),
+                Rectangle(min_x=10, max_x=20, min_y=10, max_y=20)])
+            self.assertEqual([], rect_set.overlapping_pairs())
+
+        def test_overlapping_pairs__identical(self):
+            rect_set = RectangleSet([Rectangle(min_x=0, max_x=1, min_y=0, max_y=1)] * 3)
+            self.assertEqual([(0, 1), (0, 2), (1, 2)], sorted(rect_set.overlapping_pairs()))
+
+        def test_overlapping_pairs__empty(self):
+            self.assertEqual([], RectangleSet().overlapping_pairs())
+
+        def test_overlapping_pairs__matches_naive(self):
+            for seed in range(5):
+                rects = make_benchmark_rectangles(300, extent=100, max_side=15, seed=seed)
+                self.assertEqual(naive_overlapping_pairs(rects),
+                                 sorted(RectangleSet(rects).overlapping_pairs()))
+
+        def test_add(self):
+            rect_set = RectangleSet()
+            self.assertEqual(0, rect_set.add(Rectangle(min_x=0, max_x=2, min_y=0, max_y=2)))
+            self.assertEqual(1, rect_set.add(Rectangle(min_x=1, max_x=3, min_y=1, max_y=3)))
+            self.assertEqual(2, len(rect_set))
+            self.assertEqual([(0, 1)], rect_set.overlapping_pairs())
+
+    class TestContainsPoint(unittest.TestCase):
+        def setUp(self):
+            self.rect = Rectangle(min_x=5, max_x=15, min_y=5, max_y=10)
+
+        def test_inside(self):
+            self.assertTrue(self.rect.contains_point(Point(7, 7)))
+
+        def test_min_edges(self):
+            self.assertTrue(self.rect.contains_point(Point(5, 7)))
+            self.assertTrue(self.rect.contains_point(Point(7, 5)))
+
+        def test_max_edges__false(self):
+            self.assertFalse(self.rect.contains_point(Point(15, 7)))
+            self.assertFalse(self.rect.contains_point(Point(7, 10)))
+
+        def test_outside__false(self):
+            self.assertFalse(self.rect.contains_point(Point(1, 7)))
+
+    class TestRectangleGrid(unittest.TestCase):
+        def setUp(self):
+            self.grid = RectangleGrid(cell_size=4)
+            self.rect_id = self.grid.insert(Rectangle(min_x=5, max_x=15, min_y=5, max_y=10))
+
+        def test_overlapping(self):
+            other_id = self.grid.insert(Rectangle(min_x=7, max_x=20, min_y=1, max_y=7))
+            self.grid.insert(Rectangle(min_x=20, max_x=24, min_y=7, max_y=15))
+            query = Rectangle(min_x=1, max_x=16, min_y=1, max_y=12)
+            self.assertEqual(set([self.rect_id, other_id]), self.grid.overlapping(query))
+
+        def test_overlapping__touching(self):
+            query = Rectangle(min_x=15, max_x=20, min_y=0, max_y=5)
+            self.assertEqual(set(), self.grid.overlapping(query))
+
+        def test_overlapping__negative_coordinates(self):
+            rect_id = self.grid.insert(Rectangle(min_x=-9.5, max_x=-0.5, min_y=-3, max_y=2))
+            query = Rectangle(min_x=-1, max_x=1, min_y=-1, max_y=1)
+            self.assertEqual(set([rect_id]), self.grid.overlapping(query))
+
+        def test_containing(self):
+            self.assertEqual(set([self.rect_id]), self.grid.containing(Point(5, 5)))
+            self.assertEqual(set(), self.grid.containing(Point(15, 5)))
+
+        def test_remove(self):
+            self.grid.remove(self.rect_id)
+            self.assertEqual(0, len(self.grid))
+            self.assertEqual(set(), self.grid.containing(Point(7, 7)))
+            self.assertEqual({}, dict(self.grid._cells))
+            self.assertRaises(KeyError, self.grid.remove, self.rect_id)
+
+        def test_matches_naive(self):
+            rects = make_clustered_rectangles(300, extent=200, clusters=3, seed=32)
+            grid = RectangleGrid(cell_size=7.5)
+            rect_ids = [grid.insert(rect) for rect in rects]
+            for rect in rects:
+                expected = set(rect_ids[j] for j, other in enumerate(rects)
+                               if other.overlaps_rectangle(rect))
+                self.assertEqual(expected, grid.overlapping(rect))
+
+        def test_invalid_cell_size(self):
+            self.assertRaises(ValueError, RectangleGrid, 0)
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    class TestRectangleArray(unittest.TestCase):
+        def setUp(self):
+            self.rect = Rectangle(min_x=5, max_x=15, min_y=5, max_y=10)
+            self.others = [Rectangle(min_x=7, max_x=20, min_y=1, max_y=7),
+                           Rectangle(min_x=20, max_x=24, min_y=7, max_y=15),
+                           Rectangle(min_x=15, max_x=20, min_y=0, max_y=5),
+                           Rectangle(min_x=1, max_x=16, min_y=1, max_y=12)]
+            self.batch = RectangleArray.from_rectangles(self.others)
+
+        def test_invalid(self):
+            self.assertRaises(ValueError, RectangleArray, [0, 5], [1, 5], [0, 0], [1, 1])
+            self.assertRaises(ValueError, RectangleArray, [0, 0], [1, 1], [0, 2], [1, 1])
+            self.assertRaises(ValueError, RectangleArray, [0], [float('nan')], [0], [1])
+            self.assertRaises(ValueError, RectangleArray, [0, 0], [1, 1], [0], [1])
+
+        def test_round_trip(self):
+            rects = self.batch.to_rectangles()
+            self.assertEqual([(r.min_x, r.max_x, r.min_y, r.max_y) for r in self.others],
+                             [(r.min_x, r.max_x, r.min_y, r.max_y) for r in rects])
+            self.assertEqual(4, len(self.batch))
+            self.assertEqual(20, self.batch[1].min_x)
+
+        def test_overlaps_mask(self):
+            self.assertEqual([True, False, False, True],
+                             self.batch.overlaps_mask(self.rect).tolist())
+
+        def test_intersection_areas(self):
+            self.assertEqual([16, 0, 0, 50], self.batch.intersection_areas(self.rect).tolist())
+
+        def test_overlap_matrix(self):
+            rects = make_benchmark_rectangles(200, extent=100, seed=33)
+            batch = RectangleArray.from_rectangles(rects)
+            matrix = batch.overlap_matrix(RectangleArray.from_rectangles(rects[:50]), block_size=64)
+            self.assertEqual((200, 50), matrix.shape)
+            for i, rect in enumerate(rects):
+                self.assertEqual([rect.overlaps_rectangle(other) for other in rects[:50]],
+                                 matrix[i].tolist())
+
+        def test_overlap_matrix__self(self):
+            matrix = self.batch.overlap_matrix(block_size=3)
+            self.assertEqual([[True, False, True, True],
+                              [False, True, False, False],
+                              [True, False, True, True],
+                              [True, False, True, True]], matrix.tolist())
+
+    class TestRectangleSlots(unittest.TestCase):
+        def test_no_dict(self):
+            rect = Rectangle(min_x=5, max_x=15, min_y=5, max_y=10)
+            self.assertFalse(hasattr(rect, '__dict__'))
+            self.assertRaises(AttributeError, setattr, rect, 'area', 50)
+
     # run tests
     unittest.main()
@@ -2,9 +2,36 @@
 # -*- coding: utf-8 -*-
 
 """Determine if provided word is palindrome.
+
+Letters and digits are compared case-insensitively and all other characters are
+ignored. find_palindromes applies the same rules to find the longest palindromic
+substring of a string, and to count all of them, in linear time.
+
+is_palindrome_buffer checks bytes, memoryviews and memory-mapped files in blocks, using
+constant memory. Only ASCII letters and digits count in byte data.
 """
 
+import collections
+import concurrent.futures
+import itertools
 import logging
+import mmap
+import os
+import random
+import string
+
+# Result of find_palindromes: longest palindromic substring of original string, its
+# start and end offsets in original string, and number of palindromic substrings
+PalindromeCensus = collections.namedtuple('PalindromeCensus', 'longest start end count')
+
+# Arguments to bytes.translate that lower ASCII letters and delete everything else
+# except ASCII digits
+_LOWER_BYTES = bytes.maketrans(string.ascii_uppercase.encode(), string.ascii_lowercase.encode())
+_SKIP_BYTES = bytes(c for c in range(256)
+                    if chr(c) not in string.ascii_letters + string.digits)
+
+# Number of bytes normalized at a time by buffer functions
+DEFAULT_BLOCK_SIZE = 1024 * 1024
 
 
 def is_palindrome(in_string):
@@ -26,12 +53,262 @@ def is_palindrome(in_string):
         j -= 1
     return True
 
+def is_palindrome_buffer(buf, block_size=DEFAULT_BLOCK_SIZE):
+    """Determine if byte data is palindrome without copying it all.
+
+    Runs the two-pointer check of is_palindrome a block at a time from each end,
+    normalizing each block in bulk with bytes.translate, so at most a few blocks are in
+    memory at once.
+
+    :type buf: bytes-like object
+    :arg buf: bytes, bytearray, memoryview or mmap to check
+
+    :type block_size: int
+    :arg block_size: number of bytes to read from each end at a time
+
+    :raise: ValueError if block_size is less than 1
+
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    # views are released even on error, so a memory-mapped buf can still be closed
+    with memoryview(buf) as raw, raw.cast('B') as view:
+        i = 0
+        j = len(view)
+        # normalized characters read from each end, back reversed, and how many are matched
+        front = back = b''
+        front_pos = back_pos = 0
+        while i < j:
+            if front_pos == len(front):
+                with view[i:min(i + block_size, j)] as block:
+                    front = _normalize_bytes(block)
+                front_pos = 0
+                i = min(i + block_size, j)
+            if back_pos == len(back) and i < j:
+                with view[max(j - block_size, i):j] as block:
+                    back = _normalize_bytes(block)[::-1]
+                back_pos = 0
+                j = max(j - block_size, i)
+            # compare as much as both ends have ready
+            size = min(len(front) - front_pos, len(back) - back_pos)
+            if front[front_pos:front_pos + size] != back[back_pos:back_pos + size]:
+                return False
+            front_pos += size
+            back_pos += size
+    # pointers have met; unmatched characters left over at either end form the middle
+    middle = front[front_pos:] + back[back_pos:][::-1]
+    return middle == middle[::-1]
+
+
+def is_palindrome_file(path, block_size=DEFAULT_BLOCK_SIZE):
+    """Determine if contents of file are palindrome; see is_palindrome_buffer.
+
+    :type path: str
+    """
+    with open(path, 'rb') as fh:
+        if not os.fstat(fh.fileno()).st_size:
+            return True
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return is_palindrome_buffer(mapped, block_size=block_size)
+
+
+def is_palindrome_many(lines, block_size=DEFAULT_BLOCK_SIZE):
+    """Determine which of newline-separated inputs are palindromes.
+
+    Text is split into lines and each is checked with is_palindrome. Byte data is read a
+    block at a time and each line is normalized in bulk, as in is_palindrome_buffer.
+    A trailing newline does not start another input.
+
+    :rtype: [bool]
+    :return: result for each line, in order
+
+    :type lines: unicode or bytes-like object
+    :arg lines: newline-separated inputs
+
+    :type block_size: int
+    :arg block_size: number of bytes of byte data to split into lines at a time
+
+    :raise: ValueError if block_size is less than 1
+
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    if isinstance(lines, str):
+        # split on '\n' only, as for byte data; str.splitlines would also split on '\r' etc.
+        text_lines = lines.split('\n')
+        if not text_lines[-1]:
+            text_lines.pop()
+        return [is_palindrome(line) for line in text_lines]
+
+    view = memoryview(lines).cast('B')
+    results = []
+    # normalized pieces of a line continuing past the end of the current block
+    pieces = []
+    in_line = False
+    for start in range(0, len(view), block_size):
+        block_lines = view[start:start + block_size].tobytes().split(b'\n')
+        for line in block_lines[:-1]:
+            pieces.append(_normalize_bytes(line))
+            normalized = b''.join(pieces)
+            results.append(normalized == normalized[::-1])
+            pieces = []
+        in_line = bool(block_lines[-1])
+        if in_line:
+            pieces.append(_normalize_bytes(block_lines[-1]))
+    if in_line:
+        normalized = b''.join(pieces)
+        results.append(normalized == normalized[::-1])
+    return results
+
+
+def find_palindromes(in_string):
+    """Find longest palindromic substring and count palindromic substrings.
+
+    Uses Manacher's algorithm over the normalized characters of in_string, so runs in
+    O(n) time. The longest palindrome is reported as a slice of the original string
+    running from its first to its last letter or digit; the earliest is chosen if there
+    are several of the same length. Substrings are counted by position over the
+    normalized characters, so 'aaa' contains six palindromic substrings.
+
+    :rtype: PalindromeCensus
+    :return: census of palindromes; longest is '' if in_string has no letters or digits,
+        and None if in_string is None
+
+    :type in_string: unicode
+    """
+    if in_string is None:
+        return PalindromeCensus(None, 0, 0, 0)
+
+    units, offsets = _normalize(in_string)
+    if not units:
+        return PalindromeCensus('', 0, 0, 0)
+
+    # interleave units with separators so even-length palindromes have a center
+    seq = [None] * (2 * len(units) + 1)
+    seq[1::2] = units
+    radii = [0] * len(seq)
+    center = right = 0
+    for i in range(len(seq)):
+        radius = min(right - i, radii[2 * center - i]) if i < right else 0
+        while (i - radius > 0 and i + radius + 1 < len(seq) and
+               seq[i - radius - 1] == seq[i + radius + 1]):
+            radius += 1
+        radii[i] = radius
+        if i + radius > right:
+            center, right = i, i + radius
+
+    # radius in seq is length of palindrome in units
+    best = max(range(len(seq)), key=radii.__getitem__)
+    first_unit = (best - radii[best]) // 2
+    start = offsets[first_unit]
+    end = offsets[first_unit + radii[best] - 1] + 1
+    count = sum((radius + 1) // 2 for radius in radii)
+    return PalindromeCensus(in_string[start:end], start, end, count)
+
+
+def longest_palindrome(in_string):
+    """Return longest palindromic substring of in_string; see find_palindromes.
+    """
+    return find_palindromes(in_string).longest
+
+
+def find_palindromes_many(documents, workers=None, chunksize=64, max_pending=None):
+    """Run find_palindromes on each document using a pool of worker processes.
+
+    Documents are taken from the iterable a chunk at a time, and no more than max_pending
+    chunks are with the workers at once, so large batches need not fit in memory.
+
+    :rtype: iterator of PalindromeCensus
+    :return: census for each document, in order, generated as chunks complete
+
+    :type documents: iterable of unicode
+    :arg documents: strings to analyze
+
+    :type workers: int
+    :arg workers: optional number of worker processes; defaults to number of CPUs
+
+    :type chunksize: int
+    :arg chunksize: number of documents sent to a worker at a time
+
+    :type max_pending: int
+    :arg max_pending: optional number of chunks submitted ahead of results being
+        consumed; defaults to twice the number of workers
+
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    documents = iter(documents)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for chunk in iter(lambda: list(itertools.islice(documents, chunksize)), []):
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_find_palindromes_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _find_palindromes_chunk(documents):
+    """Worker entry point: return list of find_palindromes results for documents.
+    """
+    return [find_palindromes(document) for document in documents]
+
+
+def benchmark_workloads():
+    """Return (name, make_input, run) workloads for the shared benchmark runner.
+    """
+    sentence = "A man, a plan, a canal... Panama! "
+    long_palindrome = sentence * 3000 + sentence[::-1] * 3000
+    # last letter before the center differs, so the two-pointer check scans everything to fail
+    last_letter = long_palindrome.rindex('a', 0, len(long_palindrome) // 2)
+    near_palindrome = (long_palindrome[:last_letter] + 'x' +
+                       long_palindrome[last_letter + 1:])
+    rand = random.Random(0)
+    random_text = ''.join(rand.choice('ab ') for _ in range(100000))
+    return [
+        ('is_palindrome/palindrome', lambda: long_palindrome, is_palindrome),
+        ('is_palindrome/near_palindrome', lambda: near_palindrome, is_palindrome),
+        ('is_palindrome_buffer/palindrome', lambda: long_palindrome.encode() * 50,
+         is_palindrome_buffer),
+        ('is_palindrome_many/text_lines', lambda: (sentence + '\n') * 20000, is_palindrome_many),
+        ('is_palindrome_many/byte_lines', lambda: (sentence + '\n').encode() * 20000,
+         is_palindrome_many),
+        ('find_palindromes/random', lambda: random_text, find_palindromes),
+        # every substring is a palindrome, maximizing Manacher's expansions and the count
+        ('find_palindromes/repeated', lambda: 'a' * 100000, find_palindromes),
+    ]
+
+
+def _normalize(in_string):
+    """Return lowered letters and digits of in_string and their offsets in in_string.
+
+    :rtype: ([unicode], [int])
+    """
+    units = []
+    offsets = []
+    for i, c in enumerate(in_string):
+        if not _skip_char(c):
+            units.append(c.lower())
+            offsets.append(i)
+    return units, offsets
+
+
+def _normalize_bytes(data):
+    """Return ASCII letters and digits of data, lowered.
+
+    :rtype: bytes
+    """
+    return bytes(data).translate(_LOWER_BYTES, _SKIP_BYTES)
+
+
 def _skip_char(c):
     return not c.isalnum()
 
 
 if __name__ == '__main__':
+    import tempfile
     import unittest
+    import unittest.mock
 
     class TestIsPalindrome(unittest.TestCase):
         def test_palindrome__odd(self):
@@ -64,5 +341,153 @@ if __name__ == '__main__':
         def test_all_punc(self):
             self.assertTrue(is_palindrome('......'))
 
+    class TestIsPalindromeBuffer(unittest.TestCase):
+        sentence = b"A man, a plan, a canal... Panama!"
+
+        def test_matches_is_palindrome(self):
+            rand = random.Random(35)
+            for _ in range(300):
+                in_bytes = bytes(rand.choice(b'abAB ,.1') for _ in range(rand.randint(0, 40)))
+                expected = is_palindrome(in_bytes.decode())
+                for block_size in (1, 2, 3, 7, 100):
+                    self.assertEqual(expected,
+                                     is_palindrome_buffer(in_bytes, block_size=block_size),
+                                     (in_bytes, block_size))
+
+        def test_sentence(self):
+            self.assertTrue(is_palindrome_buffer(self.sentence, block_size=4))
+            self.assertFalse(is_palindrome_buffer(self.sentence + b'x', block_size=4))
+
+        def test_buffer_types(self):
+            for buf in (bytearray(self.sentence), memoryview(self.sentence)):
+                self.assertTrue(is_palindrome_buffer(buf, block_size=5))
+
+        def test_empty(self):
+            self.assertTrue(is_palindrome_buffer(b''))
+            self.assertTrue(is_palindrome_buffer(b'......'))
+
+        def test_file(self):
+            with tempfile.NamedTemporaryFile(delete=False) as fh:
+                fh.write(self.sentence * 1001)
+            try:
+                self.assertTrue(is_palindrome_file(fh.name, block_size=64))
+            finally:
+                os.remove(fh.name)
+
+        def test_file__error(self):
+            """Verify error while checking file is raised as is, after closing memory map.
+            """
+            with tempfile.NamedTemporaryFile(delete=False) as fh:
+                fh.write(self.sentence)
+            try:
+                with unittest.mock.patch(__name__ + '._normalize_bytes', side_effect=MemoryError):
+                    self.assertRaises(MemoryError, is_palindrome_file, fh.name, block_size=4)
+            finally:
+                os.remove(fh.name)
+
+        def test_block_size__invalid(self):
+            for block_size in (0, -1):
+                self.assertRaises(ValueError, is_palindrome_buffer, b'abc', block_size=block_size)
+                self.assertRaises(ValueError, is_palindrome_many, b'abc', block_size=block_size)
+
+        def test_file__empty(self):
+            with tempfile.NamedTemporaryFile(delete=False) as fh:
+                pass
+            try:
+                self.assertTrue(is_palindrome_file(fh.name))
+            finally:
+                os.remove(fh.name)
+
+        def test_many(self):
+            lines = ['aba', 'abc', '', 'A man, a plan, a canal... Panama!', 'ab']
+            expected = [True, False, True, True, False]
+            self.assertEqual(expected, is_palindrome_many('\n'.join(lines)))
+            self.assertEqual([], is_palindrome_many(''))
+            for block_size in (1, 4, 1000):
+                self.assertEqual(expected, is_palindrome_many(
+                    '\n'.join(lines).encode() + b'\n', block_size=block_size))
+
+        def test_many__long_line(self):
+            """Verify lines spanning many blocks, including unmatched punctuation-only pieces.
+            """
+            data = b'ab' * 50 + b'.' * 10 + b'BA' * 50 + b'\n' + b'...' + b'\n' + b'abc' * 20
+            for block_size in (1, 3, 7, 64):
+                self.assertEqual([True, True, False],
+                                 is_palindrome_many(data, block_size=block_size))
+            self.assertEqual([True], is_palindrome_many(b'....', block_size=2))
+
+        def test_many__other_line_breaks(self):
+            """Verify only '\\n' separates inputs, for text and bytes alike.
+            """
+            self.assertEqual([True], is_palindrome_many('ab\rba'))
+            self.assertEqual([True], is_palindrome_many(b'ab\rba'))
+            self.assertEqual([True, False], is_palindrome_many('a\u2028a\nab\n'))
+
+    class TestFindPalindromes(unittest.TestCase):
+        def _brute_force(self, in_string):
+            """Return (longest length, count) by checking every normalized substring.
+            """
+            units, _ = _normalize(in_string)
+            longest = 0
+            count = 0
+            for i in range(len(units)):
+                for j in range(i+1, len(units)+1):
+                    if units[i:j] == units[i:j][::-1]:
+                        count += 1
+                        longest = max(longest, j - i)
+            return longest, count
+
+        def test_sentence(self):
+            census = find_palindromes("Wow. A man, a plan, a canal... Panama!?")
+            self.assertEqual('A man, a plan, a canal... Panama', census.longest)
+            self.assertEqual((5, 37), (census.start, census.end))
+
+        def test_even(self):
+            self.assertEqual('abba', longest_palindrome('xabbay'))
+
+        def test_earliest(self):
+            self.assertEqual('aba', longest_palindrome('abacdc'))
+
+        def test_count(self):
+            self.assertEqual(6, find_palindromes('aaa').count)
+            self.assertEqual(3, find_palindromes('abc').count)
+            self.assertEqual(4, find_palindromes('Ab-a').count)
+
+        def test_no_letters(self):
+            self.assertEqual(PalindromeCensus('', 0, 0, 0), find_palindromes('......'))
+            self.assertEqual(PalindromeCensus('', 0, 0, 0), find_palindromes(''))
+
+        def test_matches_brute_force(self):
+            rand = random.Random(34)
+            for _ in range(200):
+                in_string = ''.join(rand.choice('abAB ,') for _ in range(rand.randint(0, 30)))
+                census = find_palindromes(in_string)
+                self.assertEqual(self._brute_force(in_string),
+                                 (len(_normalize(census.longest)[0]), census.count))
+                self.assertTrue(is_palindrome(census.longest))
+                self.assertEqual(census.longest, in_string[census.start:census.end])
+
+        def test_none(self):
+            self.assertEqual(PalindromeCensus(None, 0, 0, 0), find_palindromes(None))
+            self.assertIsNone(longest_palindrome(None))
+
+        def test_find_palindromes_many(self):
+            documents = ['abba', 'racecar!', '', 'xyz', None]
+            self.assertEqual([find_palindromes(d) for d in documents],
+                             list(find_palindromes_many(documents, workers=2, chunksize=1)))
+
+        def test_find_palindromes_many__bounded(self):
+            """Verify documents are read only as far as the window of pending chunks.
+            """
+            read = []
+            def documents():
+                for i in range(100):
+                    read.append(i)
+                    yield 'abba'
+            results = find_palindromes_many(documents(), workers=1, chunksize=2, max_pending=3)
+            self.assertEqual(find_palindromes('abba'), next(results))
+            self.assertLessEqual(len(read), 4 * 2 + 1)
+            self.assertEqual(99, len(list(results)))
+
     # run tests
     unittest.main()
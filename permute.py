@@ -2,10 +2,18 @@
 # -*- coding: utf-8 -*-
 
 """Generate all possible words from provided set of letters.
+
+generate_combos builds every ordering of the letters, including repeats when a letter
+occurs more than once. iter_permutations lazily yields each distinct ordering once, in
+lexicographic order, and rank_permutation and unrank_permutation number those orderings
+so that ranges of them can be shared out between workers. generate_words walks a trie of
+valid words instead, so only orderings that can still become words are explored.
 """
 
+import collections
 import logging
 import math
+import random
 
 def generate_combos(letters):
     if not letters:
@@ -20,9 +28,273 @@ def generate_combos(letters):
         for subcombo in generate_combos(other_letters):
             combos.append(letters[i] + subcombo)
     return combos
-        
+
+
+def iter_permutations(letters, start=0, stop=None):
+    """Generate distinct permutations of letters as strings, in lexicographic order.
+
+    Each permutation is produced from the previous one in place (Knuth's algorithm L),
+    so memory use does not depend on the number of permutations, and repeated letters
+    never produce the same permutation twice.
+
+    :type letters: unicode or [unicode]
+    :arg letters: letters to permute; may contain repeats
+
+    :type start: int
+    :arg start: rank of first permutation to generate; defaults to 0
+
+    :type stop: int
+    :arg stop: optional rank to stop before; defaults to count_permutations(letters)
+
+    """
+    total = count_permutations(letters)
+    stop = total if stop is None else min(stop, total)
+    if start >= stop:
+        return
+    current = _unrank_permutation(letters, start)
+    for _ in range(stop - start - 1):
+        yield ''.join(current)
+        _next_permutation(current)
+    yield ''.join(current)
+
+
+def count_permutations(letters):
+    """Return number of distinct permutations of letters; 0 if there are no letters.
+
+    :type letters: unicode or [unicode]
+    """
+    if not letters:
+        return 0
+    total = math.factorial(len(letters))
+    for count in collections.Counter(letters).values():
+        total //= math.factorial(count)
+    return total
+
+
+def rank_permutation(permutation):
+    """Return position of permutation among distinct permutations of its letters.
+
+    Positions count from 0 in lexicographic order, as generated by iter_permutations.
+
+    :type permutation: unicode or [unicode]
+    """
+    counts = collections.Counter(permutation)
+    remaining = len(permutation)
+    # number of distinct permutations of remaining letters
+    total = count_permutations(permutation)
+    rank = 0
+    for letter in permutation:
+        for smaller in sorted(counts):
+            if smaller >= letter:
+                break
+            if counts[smaller]:
+                rank += total * counts[smaller] // remaining
+        total = total * counts[letter] // remaining
+        counts[letter] -= 1
+        remaining -= 1
+    return rank
+
+
+def unrank_permutation(letters, rank):
+    """Return permutation of letters at provided position; inverse of rank_permutation.
+
+    :raise: IndexError if rank is not less than count_permutations(letters)
+
+    :rtype: unicode
+
+    :type letters: unicode or [unicode]
+    :arg letters: letters to permute; order does not matter
+
+    :type rank: int
+    :arg rank: position of permutation in lexicographic order, counting from 0
+
+    """
+    return ''.join(_unrank_permutation(letters, rank))
+
+
+def _unrank_permutation(letters, rank):
+    """Return permutation at provided position as list of letters; see unrank_permutation.
+
+    Letters are kept separate so that letters of more than one character are not split.
+    """
+    total = count_permutations(letters)
+    if not 0 <= rank < total:
+        raise IndexError("rank out of range")
+    counts = collections.Counter(letters)
+    permutation = []
+    for remaining in range(len(letters), 0, -1):
+        for letter in sorted(counts):
+            if not counts[letter]:
+                continue
+            # number of permutations starting with letter
+            block = total * counts[letter] // remaining
+            if rank < block:
+                break
+            rank -= block
+        permutation.append(letter)
+        total = block
+        counts[letter] -= 1
+    return permutation
+
+
+def shard_permutations(letters, num_shards):
+    """Split ranks of distinct permutations of letters into contiguous ranges.
+
+    Pass each range to iter_permutations as start and stop to generate one shard; the
+    shards together produce every permutation exactly once.
+
+    :rtype: [(int, int)]
+    :return: list of (start, stop) ranks, differing in size by at most one
+
+    :type letters: unicode or [unicode]
+
+    :type num_shards: int
+    :arg num_shards: number of ranges to create
+
+    """
+    total = count_permutations(letters)
+    return [(total * i // num_shards, total * (i + 1) // num_shards)
+            for i in range(num_shards)]
+
+
+class WordTrie(object):
+    def __init__(self, valid_words=None):
+        """Initialize prefix tree holding provided words.
+
+        Words can be added later using the add_word method.
+
+        :type valid_words: iterable of unicode
+        """
+        # nested dicts mapping letter to child node; _WORD_END key marks end of a word
+        self._root = {}
+        for word in valid_words or []:
+            self.add_word(word)
+
+    def add_word(self, word):
+        """Add word to trie.
+
+        :type word: unicode
+        """
+        node = self._root
+        for letter in word:
+            node = node.setdefault(letter, {})
+        node[_WORD_END] = True
+
+    def __contains__(self, word):
+        node = self._find_node(word)
+        return node is not None and _WORD_END in node
+
+    def has_prefix(self, prefix):
+        """Return True if some word in trie starts with prefix.
+
+        :type prefix: unicode
+        """
+        return self._find_node(prefix) is not None
+
+    def _find_node(self, prefix):
+        node = self._root
+        for letter in prefix:
+            node = node.get(letter)
+            if node is None:
+                return None
+        return node
+
+
+# Key marking end of word in WordTrie nodes; cannot collide with a letter
+_WORD_END = None
+
+def generate_words(letters, valid_words, partial=False):
+    """Generate valid words that can be spelled with provided letters.
+
+    Letters are placed one at a time while walking down a trie of valid words, and a
+    branch is abandoned as soon as its prefix does not start any valid word. Running time
+    therefore follows the number of valid prefixes rather than the number of orderings.
+    Repeated letters are tracked by count, so each word is produced once.
+
+    :rtype: [unicode]
+    :return: valid words in lexicographic order
+
+    :type letters: unicode or [unicode]
+    :arg letters: letters available; each may be used as many times as it occurs
+
+    :type valid_words: WordTrie or iterable of unicode
+    :arg valid_words: words to accept; pass a WordTrie to reuse it across calls
+
+    :type partial: bool
+    :arg partial: if True, also generate words that use only some of the letters
+
+    """
+    if not letters:
+        return []
+    trie = valid_words if isinstance(valid_words, WordTrie) else WordTrie(valid_words)
+    words = []
+    _collect_words(trie._root, collections.Counter(letters), len(letters), [], partial, words)
+    return words
+
+
+def _collect_words(node, counts, remaining, prefix, partial, words):
+    """Append to words every valid word that extends prefix using remaining letter counts.
+
+    :type node: dict
+    :arg node: trie node reached by prefix
+    """
+    if _WORD_END in node and prefix and (partial or not remaining):
+        words.append(''.join(prefix))
+    for letter in sorted(letter for letter in node if letter is not _WORD_END):
+        if counts[letter]:
+            counts[letter] -= 1
+            prefix.append(letter)
+            _collect_words(node[letter], counts, remaining - 1, prefix, partial, words)
+            prefix.pop()
+            counts[letter] += 1
+
+
+def _next_permutation(items):
+    """Reorder items in place into next permutation in lexicographic order.
+
+    :rtype: bool
+    :return: False if items were already in last permutation, in which case they are
+        reordered into the first
+
+    """
+    i = len(items) - 2
+    while i >= 0 and items[i] >= items[i+1]:
+        i -= 1
+    if i >= 0:
+        j = len(items) - 1
+        while items[j] <= items[i]:
+            j -= 1
+        items[i], items[j] = items[j], items[i]
+    items[i+1:] = reversed(items[i+1:])
+    return i >= 0
+
+
+def benchmark_workloads():
+    """Return (name, make_input, run) workloads for the shared benchmark runner.
+    """
+    # random stand-in dictionary over the same 16 letters the word search uses
+    letters = 'abcdefghijklmnop'
+    rand = random.Random(0)
+    dictionary = [''.join(rand.choice(letters) for _ in range(rand.randint(3, 10)))
+                  for _ in range(20000)]
+    workloads = []
+    for word in ('fraggle', 'abcdefgh', 'aabbccdd'):
+        workloads.extend([
+            ('generate_combos/' + word, lambda word=word: list(word), generate_combos),
+            ('iter_permutations/' + word, lambda word=word: word,
+             lambda word: list(iter_permutations(word))),
+        ])
+    workloads.extend([
+        ('unrank_permutation/mississippi', lambda: 'mississippi',
+         lambda word: [unrank_permutation(word, rank) for rank in range(0, 34650, 35)]),
+        ('generate_words/16 letters', lambda: WordTrie(dictionary),
+         lambda trie: generate_words(letters, trie, partial=True)),
+    ])
+    return workloads
+
         
 if __name__ == '__main__':
+    import itertools
     import unittest
 
     class TestGenerateCombos(unittest.TestCase):
@@ -45,5 +317,112 @@ if __name__ == '__main__':
         def test_single_letter(self):
             self.assertEqual(['a'], generate_combos(['a']))
 
+    class TestIterPermutations(unittest.TestCase):
+        def test_abc(self):
+            self.assertEqual(['abc', 'acb', 'bac', 'bca', 'cab', 'cba'],
+                             list(iter_permutations('cab')))
+
+        def test_fraggle(self):
+            """Verify each distinct permutation is generated once, in order.
+            """
+            permutations = list(iter_permutations('fraggle'))
+            self.assertEqual(2520, len(permutations))
+            self.assertEqual(sorted(set(generate_combos(list('fraggle')))), permutations)
+
+        def test_letter_list(self):
+            self.assertEqual(['aab', 'aba', 'baa'], list(iter_permutations(['b', 'a', 'a'])))
+
+        def test_multi_character_letters(self):
+            """Verify items of more than one character are permuted as single letters.
+            """
+            self.assertEqual(['abc', 'cab'], list(iter_permutations(['ab', 'c'])))
+            self.assertEqual(['cab'], list(iter_permutations(['ab', 'c'], start=1)))
+
+        def test_lazy(self):
+            """Verify generating first permutations of a long word is immediate.
+            """
+            permutations = iter_permutations('abcdefghijklmnopqrstuvwxyz')
+            self.assertEqual('abcdefghijklmnopqrstuvwxyz', next(permutations))
+            self.assertEqual('abcdefghijklmnopqrstuvwxzy', next(permutations))
+
+        def test_empty(self):
+            self.assertEqual([], list(iter_permutations('')))
+            self.assertEqual([], list(iter_permutations(None)))
+
+        def test_single_letter(self):
+            self.assertEqual(['a'], list(iter_permutations('a')))
+
+        def test_start_stop(self):
+            self.assertEqual(['aba', 'baa'], list(iter_permutations('aab', start=1)))
+            self.assertEqual(['aba'], list(iter_permutations('aab', start=1, stop=2)))
+            self.assertEqual([], list(iter_permutations('aab', start=3)))
+
+    class TestRankPermutation(unittest.TestCase):
+        def test_count_permutations(self):
+            self.assertEqual(2520, count_permutations('fraggle'))
+            self.assertEqual(34650, count_permutations('mississippi'))
+            self.assertEqual(0, count_permutations(''))
+
+        def test_rank_unrank(self):
+            for word in ('fraggle', 'abcd', 'aabbb', 'z'):
+                for rank, permutation in enumerate(iter_permutations(word)):
+                    self.assertEqual(rank, rank_permutation(permutation))
+                    self.assertEqual(permutation, unrank_permutation(word, rank))
+
+        def test_unrank__out_of_range(self):
+            self.assertRaises(IndexError, unrank_permutation, 'aab', 3)
+            self.assertRaises(IndexError, unrank_permutation, 'aab', -1)
+
+        def test_shard_permutations(self):
+            shards = shard_permutations('mississippi', 7)
+            self.assertEqual(7, len(shards))
+            sharded = itertools.chain.from_iterable(
+                iter_permutations('mississippi', start, stop) for start, stop in shards)
+            self.assertEqual(list(iter_permutations('mississippi')), list(sharded))
+
+    class TestGenerateWords(unittest.TestCase):
+        valid_words = ['eat', 'ate', 'tea', 'team', 'meat', 'mate', 'tame', 'me', 'a',
+                       'teammate', 'bubble', 'at', 'eta']
+
+        def test_full_length(self):
+            self.assertEqual(['mate', 'meat', 'tame', 'team'],
+                             generate_words('meta', self.valid_words))
+
+        def test_partial(self):
+            self.assertEqual(['a', 'at', 'ate', 'eat', 'eta', 'tea'],
+                             generate_words('tea', self.valid_words, partial=True))
+
+        def test_repeated_letters(self):
+            self.assertEqual(['teammate'], generate_words('aaeemmtt', self.valid_words))
+            self.assertEqual(['bubble'], generate_words('bbbelu', self.valid_words))
+
+        def test_matches_brute_force(self):
+            letters = 'mateeat'
+            expected = set()
+            for length in range(1, len(letters) + 1):
+                expected.update(''.join(p) for p in itertools.permutations(letters, length))
+            expected &= set(self.valid_words)
+            self.assertEqual(sorted(expected),
+                             generate_words(letters, WordTrie(self.valid_words), partial=True))
+
+        def test_long_input(self):
+            """Verify 20 letters are practical when few prefixes are valid.
+            """
+            expected = sorted(w for w in self.valid_words if w != 'bubble')
+            self.assertEqual(expected, generate_words('teammate' + 'xyzqvjkwbpfg',
+                                                      self.valid_words, partial=True))
+
+        def test_no_letters(self):
+            self.assertEqual([], generate_words('', self.valid_words))
+            self.assertEqual([], generate_words(None, self.valid_words))
+
+        def test_word_trie(self):
+            trie = WordTrie(['team'])
+            trie.add_word('tea')
+            self.assertIn('tea', trie)
+            self.assertNotIn('te', trie)
+            self.assertTrue(trie.has_prefix('te'))
+            self.assertFalse(trie.has_prefix('x'))
+
     # run tests
     unittest.main()
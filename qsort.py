@@ -2,12 +2,64 @@
 # -*- coding: utf-8 -*-
 
 """Because everyone loves quicksort.
+
+quicksort is the textbook version: last-item pivot, two-way partition and recursion on
+both sides. introsort is the production version: median-of-three (or ninther) pivot,
+three-way partition, explicit stack, heapsort fallback and insertion sort for small
+ranges, giving O(n log n) on any input. sort_buffer applies introsort in place to
+typed buffers such as array.array and numpy arrays, and parallel_sort spreads that work
+across a pool of processes sharing memory. external_sort handles files larger than
+memory and is also available from the command line:
+
+    python qsort.py --external-sort INFILE OUTFILE [--record-size N] [--memory-budget N]
+
+Run with no arguments to run the tests. Benchmarks are run by benchmark.py.
 """
 
+import array
+import concurrent.futures
+import contextlib
+import ctypes
+import heapq
 import logging
+import math
+import mmap
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from multiprocessing import shared_memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 num_tabs = 0
 
+# Ranges with fewer items than this are finished with insertion sort
+INSERTION_SORT_THRESHOLD = 16
+
+# Ranges with at least this many items choose pivot using Tukey's ninther
+NINTHER_THRESHOLD = 128
+
+# Ranges with at least this many items are partitioned with numpy, when available
+NUMPY_PARTITION_THRESHOLD = 512
+
+# Most items compared at once by numpy, which bounds the size of temporary arrays
+NUMPY_BLOCK_SIZE = 65536
+
+# Buffers with fewer items than this are not worth sorting in parallel
+PARALLEL_THRESHOLD = 100000
+
+# Default number of bytes of records external_sort holds in memory at once
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Default number of run files external_sort merges at once
+DEFAULT_MAX_OPEN_RUNS = 64
+
 def quicksort(items, start_idx=None, end_idx=None):
     """
     :type items: list of comparable objects
@@ -26,10 +78,11 @@ def quicksort(items, start_idx=None, end_idx=None):
         end_idx = len(items)-1 if items else 0
 
     if start_idx < end_idx:
-        log_debug("reordering items {0}-{1}: {2}".format(
-                start_idx, end_idx, items[start_idx:end_idx-start_idx+1]))
+        if _debug_enabled():
+            log_debug("reordering items {0}-{1}: {2}",
+                      start_idx, end_idx, items[start_idx:end_idx-start_idx+1])
         pivot_idx = partition(items, start_idx, end_idx)
-        log_debug("splitting on item {0}; items={1}".format(pivot_idx, items))
+        log_debug("splitting on item {0}; items={1}", pivot_idx, items)
 
         global num_tabs
         num_tabs += 1
@@ -60,34 +113,851 @@ def partition(items, start_idx, end_idx):
     placeholder_idx = start_idx
     i = placeholder_idx 
 
-    log_debug('pivot_val={0}'.format(pivot_val))
+    # checked once, so comparisons cost nothing extra when debug logging is off
+    debug = _debug_enabled()
+    log_debug('pivot_val={0}', pivot_val)
 
     while i < end_idx:
         # if current item is less than or equal to the pivot value, swap it with placeholder item
         if items[i] <= pivot_val:
-            log_debug('[{0}] {1} <= {2}; swapping {1} with {3}'.format(
-                    i, items[i], pivot_val, items[placeholder_idx]))
+            if debug:
+                log_debug('[{0}] {1} <= {2}; swapping {1} with {3}',
+                          i, items[i], pivot_val, items[placeholder_idx])
             items[placeholder_idx], items[i] = items[i], items[placeholder_idx]
             placeholder_idx += 1
-        else:
-            log_debug('[{0}] {1} > {2}; do nothing'.format(i, items[i], pivot_val))
+        elif debug:
+            log_debug('[{0}] {1} > {2}; do nothing', i, items[i], pivot_val)
         i += 1
         
     # swap pivot value with placeholder value
-    log_debug('swapping pivot {0} with placeholder {1}'.format(pivot_val, items[placeholder_idx]))
+    log_debug('swapping pivot {0} with placeholder {1}', pivot_val, items[placeholder_idx])
     items[placeholder_idx], items[pivot_idx] = items[pivot_idx], items[placeholder_idx]
 
     # return location of pivot
     return placeholder_idx
     
 
-def log_debug(msg):
-    logging.debug("{0}{1}".format('  '*num_tabs, msg))
+def introsort(items, start_idx=None, end_idx=None, key=None):
+    """Sort items in place in guaranteed O(n log n) time.
+
+    Ranges are partitioned three ways around a median-of-three or ninther pivot, so
+    runs of duplicate items are finished in a single pass. The smaller side of each
+    partition is sorted first and the larger side is pushed on an explicit stack, which
+    bounds the stack at O(log n) entries. If partitioning goes deeper than 2*log2(n)
+    levels, the range is finished with heapsort instead.
+
+    :type items: list of comparable objects
+    :arg items: items to be sorted; only the < operator is used
+
+    :type start_idx: int
+    :arg start_idx: optional index of first item to be sorted; defaults to 0
+
+    :type end_idx: int
+    :arg end_idx: optional index of last item to be sorted; defaults to len(items) -1
+
+    :type key: callable
+    :arg key: optional function of one item returning value to sort by; called once per
+        item, and items with equal keys keep their relative order
+
+    """
+    if start_idx is None:
+        start_idx = 0
+    if end_idx is None:
+        end_idx = len(items)-1 if items else 0
+    if start_idx >= end_idx:
+        return
+    if key is not None:
+        _apply_to_keys(items, start_idx, end_idx, key, introsort)
+        return
+
+    depth_budget = 2 * int(math.log(end_idx - start_idx + 1, 2))
+    stack = [(start_idx, end_idx, depth_budget)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        while hi - lo >= INSERTION_SORT_THRESHOLD:
+            if depth == 0:
+                _heapsort(items, lo, hi)
+                break
+            depth -= 1
+            pivot_val = items[_choose_pivot(items, lo, hi)]
+            lt, gt = partition3(items, lo, hi, pivot_val)
+            # push larger side, keep working on smaller side
+            if lt - lo < hi - gt:
+                stack.append((gt+1, hi, depth))
+                hi = lt - 1
+            else:
+                stack.append((lo, lt-1, depth))
+                lo = gt + 1
+        else:
+            _insertion_sort(items, lo, hi)
+
+
+def partition3(items, start_idx, end_idx, pivot_val):
+    """Reorder items into those less than, equal to and greater than pivot_val.
+
+    This is Dijkstra's Dutch national flag partition.
+
+    :rtype: (int, int)
+    :return: indexes of first and last items equal to pivot_val; if no item equals
+        pivot_val, the first index is one greater than the last
+
+    :type start_idx: int
+    :arg start_idx: index of first item to be reordered
+
+    :type end_idx: int
+    :arg end_idx: index of last item to be reordered
+
+    :arg pivot_val: value to partition around
+
+    """
+    lt = start_idx
+    i = start_idx
+    gt = end_idx
+    while i <= gt:
+        item = items[i]
+        if item < pivot_val:
+            items[lt], items[i] = item, items[lt]
+            lt += 1
+            i += 1
+        elif pivot_val < item:
+            items[gt], items[i] = item, items[gt]
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def _choose_pivot(items, start_idx, end_idx):
+    """Return index of median of three items, or of Tukey's ninther for large ranges.
+    """
+    mid_idx = start_idx + (end_idx - start_idx) // 2
+    if end_idx - start_idx + 1 < NINTHER_THRESHOLD:
+        return _median_of_three(items, start_idx, mid_idx, end_idx)
+    step = (end_idx - start_idx) // 8
+    return _median_of_three(
+        items,
+        _median_of_three(items, start_idx, start_idx + step, start_idx + 2*step),
+        _median_of_three(items, mid_idx - step, mid_idx, mid_idx + step),
+        _median_of_three(items, end_idx - 2*step, end_idx - step, end_idx))
+
+
+def _median_of_three(items, a, b, c):
+    """Return whichever of indexes a, b and c holds the median value.
+    """
+    if items[a] < items[b]:
+        if items[b] < items[c]:
+            return b
+        return c if items[a] < items[c] else a
+    if items[a] < items[c]:
+        return a
+    return c if items[b] < items[c] else b
+
+
+def _insertion_sort(items, start_idx, end_idx):
+    for i in range(start_idx+1, end_idx+1):
+        item = items[i]
+        j = i - 1
+        while j >= start_idx and item < items[j]:
+            items[j+1] = items[j]
+            j -= 1
+        items[j+1] = item
+
+
+def _heapsort(items, start_idx, end_idx):
+    size = end_idx - start_idx + 1
+    for root in range(size//2 - 1, -1, -1):
+        _sift_down(items, start_idx, root, size)
+    for last in range(size-1, 0, -1):
+        items[start_idx], items[start_idx+last] = items[start_idx+last], items[start_idx]
+        _sift_down(items, start_idx, 0, last)
+
+
+def _sift_down(items, offset, root, size):
+    """Restore max-heap order below root in heap of size items starting at offset.
+    """
+    while True:
+        child = 2*root + 1
+        if child >= size:
+            return
+        if child+1 < size and items[offset+child] < items[offset+child+1]:
+            child += 1
+        if items[offset+root] < items[offset+child]:
+            items[offset+root], items[offset+child] = items[offset+child], items[offset+root]
+            root = child
+        else:
+            return
+
+
+def quickselect(items, k, key=None):
+    """Return k-th smallest item in expected linear time.
+
+    Items are partially reordered in place: items[k] ends up in its sorted position, with
+    no greater item before it and no smaller item after it.
+
+    :raise: IndexError if k is out of range
+
+    :type items: list of comparable objects
+    :arg items: items to select from
+
+    :type k: int
+    :arg k: 0-based rank of item to return; negative values count from the largest
+
+    :type key: callable
+    :arg key: optional function of one item returning value to compare by; called once per item
+
+    """
+    if k < 0:
+        k += len(items)
+    if not 0 <= k < len(items):
+        raise IndexError("k out of range")
+    if key is None:
+        _select(items, k, 0, len(items)-1)
+    else:
+        _apply_to_keys(items, 0, len(items)-1, key, _select, k, 0, len(items)-1)
+    return items[k]
+
+
+def partial_sort(items, k, key=None):
+    """Reorder items in place so the first k are the k smallest, in sorted order.
+
+    Runs in O(n + k log k) time; the order of the remaining items is unspecified.
+
+    :type items: list of comparable objects
+    :arg items: items to be partially sorted
+
+    :type k: int
+    :arg k: number of smallest items to sort to the front
+
+    :type key: callable
+    :arg key: optional function of one item returning value to sort by; called once per item
+
+    """
+    k = min(k, len(items))
+    if k <= 0:
+        return
+    if key is None:
+        _partial_sort(items, k)
+    else:
+        _apply_to_keys(items, 0, len(items)-1, key, _partial_sort, k)
+
+
+def nsmallest(n, iterable, key=None):
+    """Return list of n smallest items in sorted order, leaving iterable unchanged.
+
+    Takes the same arguments as heapq.nsmallest.
+    """
+    items = list(iterable)
+    partial_sort(items, n, key=key)
+    return items[:max(n, 0)]
+
+
+def nlargest(n, iterable, key=None):
+    """Return list of n largest items, largest first, leaving iterable unchanged.
+
+    Takes the same arguments as heapq.nlargest, and as with it, items with equal keys are
+    returned in their original order.
+    """
+    items = list(iterable)
+    n = min(n, len(items))
+    if n <= 0:
+        return []
+    start_idx = len(items) - n
+    if key is None:
+        _partial_sort_tail(items, start_idx)
+        largest = items[start_idx:]
+        largest.reverse()
+        return largest
+    # negated indexes make earlier items sort last among ties, and so come first reversed
+    decorated = [(key(item), -i) for i, item in enumerate(items)]
+    _partial_sort_tail(decorated, start_idx)
+    return [items[-i] for _, i in reversed(decorated[start_idx:])]
+
+
+def percentile(items, pct):
+    """Return pct-th percentile of numbers, interpolating linearly between closest ranks.
+
+    This matches the default method of numpy.percentile. Runs in expected linear time
+    and leaves items unchanged.
+
+    :raise: ValueError if items is empty or pct is not between 0 and 100
+
+    :type items: iterable of numbers
+    :arg items: numbers to take percentile of
+
+    :type pct: float
+    :arg pct: percentile between 0 and 100
+
+    """
+    if not 0 <= pct <= 100:
+        raise ValueError("pct must be between 0 and 100")
+    values = list(items)
+    if not values:
+        raise ValueError("Cannot take percentile of no items")
+    rank = (len(values) - 1) * pct / 100.0
+    lower_idx = int(math.floor(rank))
+    lower = quickselect(values, lower_idx)
+    if rank == lower_idx:
+        return lower
+    # items after lower_idx are no smaller than lower, so next rank is the least of them
+    upper = min(values[lower_idx+1:])
+    return lower + (upper - lower) * (rank - lower_idx)
+
+
+def median(items):
+    """Return median of numbers; average of middle two if there is an even number of them.
+    """
+    return percentile(items, 50)
+
+
+def _select(items, k, start_idx, end_idx):
+    """Reorder items between start_idx and end_idx so that items[k] is in sorted position.
+
+    Only the side of each partition containing k is visited. If partitioning goes deeper
+    than 2*log2(n) levels, the remaining range is sorted with introsort instead.
+    """
+    depth = 2 * int(math.log(end_idx - start_idx + 1, 2))
+    lo, hi = start_idx, end_idx
+    while hi - lo >= INSERTION_SORT_THRESHOLD:
+        if depth == 0:
+            introsort(items, start_idx=lo, end_idx=hi)
+            return
+        depth -= 1
+        lt, gt = partition3(items, lo, hi, items[_choose_pivot(items, lo, hi)])
+        if k < lt:
+            hi = lt - 1
+        elif k > gt:
+            lo = gt + 1
+        else:
+            return
+    _insertion_sort(items, lo, hi)
+
+
+def _partial_sort(items, k):
+    _select(items, k-1, 0, len(items)-1)
+    introsort(items, start_idx=0, end_idx=k-1)
+
+
+def _partial_sort_tail(items, start_idx):
+    _select(items, start_idx, 0, len(items)-1)
+    introsort(items, start_idx=start_idx, end_idx=len(items)-1)
+
+
+def _apply_to_keys(items, start_idx, end_idx, key, func, *args):
+    """Call func on keys of items between start_idx and end_idx, then reorder items to match.
+
+    Each key is computed once and paired with its item's index, so ties are broken by
+    original position and the items themselves are never compared.
+
+    :return: result of func
+
+    :type func: callable
+    :arg func: function reordering list in place, called as func(decorated_keys, *args);
+        indexes in args are relative to start_idx
+
+    """
+    decorated = [(key(items[i]), i) for i in range(start_idx, end_idx+1)]
+    result = func(decorated, *args)
+    items[start_idx:end_idx+1] = [items[i] for _, i in decorated]
+    return result
+
+
+def sort_buffer(buf, start_idx=None, end_idx=None):
+    """Sort writable buffer of numbers in place without copying it to a list.
+
+    Accepts any object supporting the buffer protocol with a native numeric format, such
+    as array.array, bytearray, memoryview, mmap or a numpy array. Multi-dimensional
+    buffers must be C-contiguous and are sorted as a single flat sequence.
+
+    If numpy is installed, ranges of at least NUMPY_PARTITION_THRESHOLD items are
+    partitioned with vectorized comparisons; smaller ranges are finished by introsort
+    working directly on a memoryview of the buffer.
+
+    :raise: TypeError if buf is read-only, cannot be viewed as 1-D or is not in a native
+        numeric format that memoryview can index (such as a byte-swapped or float16 numpy
+        array)
+    :raise: ValueError if buf contains NaN
+
+    :type buf: writable buffer
+    :arg buf: numbers to be sorted
+
+    :type start_idx: int
+    :arg start_idx: optional index of first item to be sorted; defaults to 0
+
+    :type end_idx: int
+    :arg end_idx: optional index of last item to be sorted; defaults to len(buf) -1
+
+    """
+    view = _as_flat_view(buf)
+    if start_idx is None:
+        start_idx = 0
+    if end_idx is None:
+        end_idx = len(view)-1 if len(view) else 0
+    if start_idx >= end_idx:
+        return
+
+    if numpy is not None and end_idx - start_idx + 1 >= NUMPY_PARTITION_THRESHOLD:
+        arr = numpy.asarray(view)
+        _check_no_nan(view, arr, start_idx, end_idx)
+        _numpy_introsort(arr, view, start_idx, end_idx)
+    else:
+        _check_no_nan(view, None, start_idx, end_idx)
+        introsort(view, start_idx=start_idx, end_idx=end_idx)
+
+
+def _as_flat_view(buf):
+    """Return writable 1-D memoryview of provided buffer.
+    """
+    try:
+        view = memoryview(buf)
+    except NotImplementedError:
+        raise TypeError("Unsupported buffer format")
+    if view.readonly:
+        raise TypeError("Buffer must be writable")
+    if view.ndim == 0 or (view.ndim > 1 and not view.c_contiguous):
+        raise TypeError("Buffer must be 1-D or C-contiguous")
+    try:
+        if view.ndim > 1:
+            view = view.cast('B').cast(view.format)
+        # memoryview only indexes native formats, such as 'd' but not '>d'
+        view[0:1].tolist()
+    except (TypeError, ValueError, NotImplementedError):
+        raise TypeError("Unsupported buffer format '{0}'".format(view.format))
+    return view
+
+
+def _check_no_nan(view, arr, start_idx, end_idx):
+    """Raise ValueError if floating-point view contains NaN between provided indexes.
+
+    :type arr: numpy.ndarray or None
+    :arg arr: numpy array sharing memory with view, used for vectorized check if provided
+
+    """
+    if arr is not None:
+        if arr.dtype.kind == 'f':
+            for i in range(start_idx, end_idx+1, NUMPY_BLOCK_SIZE):
+                if numpy.isnan(arr[i:min(i+NUMPY_BLOCK_SIZE, end_idx+1)]).any():
+                    raise ValueError("Cannot sort buffer containing NaN")
+    elif view.format in ('f', 'd'):
+        for i in range(start_idx, end_idx+1):
+            if view[i] != view[i]:
+                raise ValueError("Cannot sort buffer containing NaN")
+
+
+def parallel_sort(buf, workers=None, tasks_per_worker=4, shm=None):
+    """Sort writable buffer of numbers in place using a pool of worker processes.
+
+    The data is partitioned at the top level until there are workers*tasks_per_worker
+    ranges. Each range is then sorted by sort_buffer in a worker process attached to the
+    same shared memory, so no item data is pickled. Ranges are submitted largest first to
+    balance the load across workers.
+
+    If buf already lives in a SharedMemory block, such as a numpy array created with
+    buffer=shm.buf, pass that block as shm and buf is sorted where it is. Otherwise buf is
+    copied into a new shared memory block and copied back once sorted, so the data is held
+    twice while sorting.
+
+    Buffers with fewer than PARALLEL_THRESHOLD items, or a single worker, are sorted in
+    the calling process.
+
+    :raise: TypeError if buf is read-only, cannot be viewed as 1-D or is not in a native
+        numeric format that memoryview can index (such as a byte-swapped or float16 numpy
+        array)
+    :raise: ValueError if buf contains NaN, or if shm is provided and buf is not
+        C-contiguous memory within it
+
+    :type buf: writable buffer
+    :arg buf: numbers to be sorted
+
+    :type workers: int
+    :arg workers: optional number of worker processes; defaults to os.cpu_count()
+
+    :type tasks_per_worker: int
+    :arg tasks_per_worker: number of ranges to create for each worker
+
+    :type shm: multiprocessing.shared_memory.SharedMemory
+    :arg shm: optional shared memory block containing buf
+
+    """
+    view = _as_flat_view(buf)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(view) < PARALLEL_THRESHOLD:
+        sort_buffer(view)
+        return
+    _check_no_nan(view, numpy.asarray(view) if numpy is not None else None, 0, len(view)-1)
+
+    if shm is not None:
+        _sort_shared(view, shm, _shared_offset(view, shm), workers, tasks_per_worker)
+        return
+
+    shm = shared_memory.SharedMemory(create=True, size=len(view) * view.itemsize)
+    try:
+        shared = shm.buf.cast('B').cast(view.format)[:len(view)]
+        try:
+            shared[:] = view
+            _sort_shared(shared, shm, 0, workers, tasks_per_worker)
+            view[:] = shared
+        finally:
+            shared.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _shared_offset(view, shm):
+    """Return offset in bytes of view from start of shared memory block.
+
+    :raise: ValueError if view is not C-contiguous memory within shm
+    """
+    try:
+        address = ctypes.addressof(ctypes.c_char.from_buffer(view))
+    except TypeError:
+        raise ValueError("Buffer must be C-contiguous to be sorted in shared memory")
+    offset = address - ctypes.addressof(ctypes.c_char.from_buffer(shm.buf))
+    if not 0 <= offset <= shm.size - view.nbytes:
+        raise ValueError("Buffer is not within shared memory block '{0}'".format(shm.name))
+    return offset
+
+
+def _sort_shared(view, shm, offset, workers, tasks_per_worker):
+    """Sort view, which starts offset bytes into shm, with a pool of worker processes.
+    """
+    ranges = _partition_ranges(view, workers * tasks_per_worker)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_sort_shared_range, shm.name, offset, view.nbytes, view.format,
+                                   lo, hi)
+                   for lo, hi in ranges]
+        for future in futures:
+            future.result()
+
+
+def _partition_ranges(view, num_ranges):
+    """Partition view until it consists of num_ranges independently sortable ranges.
+
+    The largest remaining range is split each time. Items equal to the pivot are left
+    in their final place and are not part of any returned range.
+
+    :rtype: [(int, int)]
+    :return: list of (start_idx, end_idx) ranges, largest first
+
+    """
+    arr = numpy.asarray(view) if numpy is not None else None
+    ranges = [(-len(view), 0, len(view)-1)]
+    while ranges and len(ranges) < num_ranges:
+        _, lo, hi = heapq.heappop(ranges)
+        if arr is not None:
+            lt, gt = _numpy_partition3(arr, lo, hi, arr[_choose_pivot(arr, lo, hi)])
+        else:
+            lt, gt = partition3(view, lo, hi, view[_choose_pivot(view, lo, hi)])
+        for sub_lo, sub_hi in ((lo, lt-1), (gt+1, hi)):
+            if sub_lo < sub_hi:
+                heapq.heappush(ranges, (sub_lo - sub_hi - 1, sub_lo, sub_hi))
+    return [(lo, hi) for _, lo, hi in sorted(ranges)]
+
+
+def _sort_shared_range(shm_name, offset, nbytes, typecode, start_idx, end_idx):
+    """Worker entry point: sort one range of the items in nbytes at offset of named shared memory.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[offset:offset+nbytes].cast(typecode)
+        try:
+            sort_buffer(view, start_idx=start_idx, end_idx=end_idx)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+
+
+def _numpy_introsort(arr, view, start_idx, end_idx):
+    """Sort arr in place, partitioning large ranges with vectorized numpy operations.
+
+    :type arr: numpy.ndarray
+    :arg arr: 1-D array sharing memory with view
+
+    :type view: memoryview
+    :arg view: 1-D view of arr used by introsort to finish small ranges
+
+    """
+    depth_budget = 2 * int(math.log(end_idx - start_idx + 1, 2))
+    stack = [(start_idx, end_idx, depth_budget)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo + 1 < NUMPY_PARTITION_THRESHOLD or depth == 0:
+            introsort(view, start_idx=lo, end_idx=hi)
+            continue
+        lt, gt = _numpy_partition3(arr, lo, hi, arr[_choose_pivot(arr, lo, hi)])
+        stack.append((lo, lt-1, depth-1))
+        stack.append((gt+1, hi, depth-1))
+
+
+def _numpy_partition3(arr, start_idx, end_idx, pivot_val):
+    """Vectorized equivalent of partition3 for 1-D numpy array without NaNs.
+
+    Items less than and greater than pivot_val are counted a block at a time, and numpy's
+    in-place introselect then moves the items at those ranks into their sorted positions.
+    Temporary arrays never hold more than NUMPY_BLOCK_SIZE items, and items equal to
+    pivot_val are moved rather than overwritten with it, since equal items may still
+    differ, as 0.0 and -0.0 do.
+    """
+    segment = arr[start_idx:end_idx+1]
+    num_less = num_greater = 0
+    for i in range(0, len(segment), NUMPY_BLOCK_SIZE):
+        block = segment[i:i+NUMPY_BLOCK_SIZE]
+        num_less += numpy.count_nonzero(block < pivot_val)
+        num_greater += numpy.count_nonzero(block > pivot_val)
+    num_not_greater = len(segment) - num_greater
+    # with the first and last equal items in place, everything between them equals pivot_val
+    segment.partition(sorted(set([num_less, num_not_greater-1])))
+    return start_idx + num_less, start_idx + num_not_greater - 1
+
+
+def external_sort(infile, outfile, memory_budget=DEFAULT_MEMORY_BUDGET, record_size=None,
+                  tmp_dir=None, max_open_runs=DEFAULT_MAX_OPEN_RUNS):
+    """Sort records of a file that may be larger than memory.
+
+    The input is read in chunks of at most memory_budget bytes, each chunk is sorted with
+    introsort and spilled to a temporary run file, and the runs are then combined with a
+    k-way heap merge over memory-mapped run files. If there are more than max_open_runs
+    runs, groups of them are first merged into longer intermediate runs, as many passes as
+    needed. Records are compared as raw bytes.
+
+    :raise: ValueError if record_size is provided and the input size is not a multiple of it,
+        or if max_open_runs is less than 2
+
+    :type infile: str
+    :arg infile: path of file to be sorted
+
+    :type outfile: str
+    :arg outfile: path of file to write sorted records to; may be the same as infile. The
+        final merge is written to a temporary file in the same directory, which replaces
+        outfile only once complete, so outfile is untouched if sorting fails
+
+    :type memory_budget: int
+    :arg memory_budget: approximate number of bytes of records to hold in memory at once
+
+    :type record_size: int
+    :arg record_size: optional size in bytes of fixed-width records; by default records are
+        newline-separated, and every output record is terminated by a newline
+
+    :type tmp_dir: str
+    :arg tmp_dir: optional directory for run files; defaults to the system temp directory
+
+    :type max_open_runs: int
+    :arg max_open_runs: most run files to merge at once; each open run holds a file descriptor
+
+    """
+    if max_open_runs < 2:
+        raise ValueError("max_open_runs must be at least 2")
+    run_paths = []
+    try:
+        with open(infile, 'rb') as in_fh:
+            for chunk in _read_chunks(in_fh, memory_budget, record_size):
+                introsort(chunk)
+                run_paths.append(_write_run(chunk, record_size, tmp_dir))
+                del chunk
+        while len(run_paths) > max_open_runs:
+            group = run_paths[:max_open_runs]
+            with tempfile.NamedTemporaryFile(suffix='.run', dir=tmp_dir, delete=False) as run_fh:
+                run_paths.append(run_fh.name)
+            _merge_runs(group, run_paths[-1], record_size)
+            for path in group:
+                os.remove(path)
+            del run_paths[:max_open_runs]
+        # outfile may be infile, so it is only replaced once the merge has fully succeeded
+        out_fd, merged_path = tempfile.mkstemp(suffix='.tmp',
+                                               dir=os.path.dirname(os.path.abspath(outfile)))
+        os.close(out_fd)
+        try:
+            _merge_runs(run_paths, merged_path, record_size)
+            if os.path.exists(outfile):
+                shutil.copymode(outfile, merged_path)
+            os.replace(merged_path, outfile)
+        except BaseException:
+            os.remove(merged_path)
+            raise
+    finally:
+        for path in run_paths:
+            os.remove(path)
+
+
+def _read_chunks(in_fh, memory_budget, record_size):
+    """Generate lists of records from in_fh, each list fitting within memory_budget.
+
+    The per-record overhead of a bytes object and its list slot is counted against the
+    budget, so chunks of short records hold fewer bytes of data.
+    """
+    overhead = sys.getsizeof(b'') + 8
+    if record_size:
+        records_per_chunk = max(1, memory_budget // (record_size + overhead))
+        while True:
+            block = in_fh.read(records_per_chunk * record_size)
+            if not block:
+                return
+            if len(block) % record_size:
+                raise ValueError("Input size is not a multiple of record size {0}".format(
+                    record_size))
+            yield [block[i:i+record_size] for i in range(0, len(block), record_size)]
+            del block
+    else:
+        chunk = []
+        chunk_size = 0
+        for line in in_fh:
+            record = line[:-1] if line.endswith(b'\n') else line
+            chunk.append(record)
+            chunk_size += len(record) + overhead
+            if chunk_size >= memory_budget:
+                yield chunk
+                chunk = []
+                chunk_size = 0
+        if chunk:
+            yield chunk
+
+
+def _write_run(records, record_size, tmp_dir):
+    """Write sorted records to new temporary file and return its path.
+    """
+    with tempfile.NamedTemporaryFile('wb', suffix='.run', dir=tmp_dir, delete=False) as run_fh:
+        if record_size:
+            run_fh.writelines(records)
+        else:
+            run_fh.writelines(record + b'\n' for record in records)
+        return run_fh.name
+
+
+def _merge_runs(run_paths, outfile, record_size):
+    """Write k-way merge of sorted run files to outfile.
+    """
+    with contextlib.ExitStack() as stack:
+        runs = []
+        for path in run_paths:
+            # mmap holds its own descriptor, so the file can be closed right away
+            with open(path, 'rb') as run_fh:
+                run_map = mmap.mmap(run_fh.fileno(), 0, access=mmap.ACCESS_READ)
+            stack.enter_context(run_map)
+            runs.append(_iter_run_records(run_map, record_size))
+        with open(outfile, 'wb') as out_fh:
+            terminator = b'' if record_size else b'\n'
+            for record in heapq.merge(*runs):
+                out_fh.write(record)
+                out_fh.write(terminator)
+
+
+def _iter_run_records(run_map, record_size):
+    """Generate records from memory-mapped run file, without record terminators.
+    """
+    pos = 0
+    size = len(run_map)
+    if record_size:
+        while pos < size:
+            yield run_map[pos:pos+record_size]
+            pos += record_size
+    else:
+        while pos < size:
+            end = run_map.find(b'\n', pos)
+            yield run_map[pos:end]
+            pos = end + 1
+
+
+def benchmark_workloads():
+    """Return (name, make_input, run) workloads for the shared benchmark runner.
+
+    Sorting, selection and parallel workloads come with list.sort, numpy.sort,
+    heapq.nsmallest and single-worker counterparts over the same data for comparison.
+    """
+    workloads = []
+    for distribution in BENCHMARK_DISTRIBUTIONS:
+        data = make_benchmark_data(distribution, 20000)
+        workloads.extend([
+            ('introsort/' + distribution, lambda data=data: list(data), introsort),
+            ('sort_buffer/' + distribution, lambda data=data: array.array('d', data), sort_buffer),
+            ('list.sort/' + distribution, lambda data=data: list(data), list.sort),
+        ])
+        if numpy is not None:
+            workloads.append(('numpy.sort/' + distribution, lambda data=data: numpy.array(data),
+                              numpy.ndarray.sort))
+    # random introsort and list.sort above are the full-sort baselines for selection
+    random_data = make_benchmark_data('random', 20000)
+    workloads.extend([
+        ('quicksort/random', lambda: random_data[:2000], quicksort),
+        # textbook pivot choice makes sorted input quadratic; kept small for recursion limit
+        ('quicksort/sorted', lambda: make_benchmark_data('sorted', 500), quicksort),
+        ('quickselect/median', lambda: list(random_data),
+         lambda items: quickselect(items, len(items) // 2)),
+        ('quickselect/median_key', lambda: list(random_data),
+         lambda items: quickselect(items, len(items) // 2, key=abs)),
+        ('introsort/random_key', lambda: list(random_data),
+         lambda items: introsort(items, key=abs)),
+        ('nsmallest/10', lambda: random_data, lambda items: nsmallest(10, items)),
+        ('heapq.nsmallest/10', lambda: random_data, lambda items: heapq.nsmallest(10, items)),
+    ])
+    parallel_data = array.array('d', make_benchmark_data('random', 2 * PARALLEL_THRESHOLD))
+    for workers in (1, 2, 4):
+        workloads.append(('parallel_sort/workers={0}'.format(workers),
+                          lambda: array.array('d', parallel_data),
+                          lambda items, workers=workers: parallel_sort(items, workers=workers)))
+    return workloads
+
+
+# Data distributions available from make_benchmark_data
+BENCHMARK_DISTRIBUTIONS = ('random', 'sorted', 'reversed', 'few_distinct', 'organ_pipe')
+
+def make_benchmark_data(distribution, size, seed=0):
+    """Return list of size numbers drawn from named distribution.
+    """
+    rand = random.Random(seed)
+    if distribution == 'random':
+        return [rand.random() for _ in range(size)]
+    if distribution == 'sorted':
+        return [float(i) for i in range(size)]
+    if distribution == 'reversed':
+        return [float(i) for i in range(size, 0, -1)]
+    if distribution == 'few_distinct':
+        return [float(rand.randint(0, 7)) for _ in range(size)]
+    if distribution == 'organ_pipe':
+        half = size // 2
+        return [float(i) for i in range(half)] + [float(i) for i in range(size - half, 0, -1)]
+    raise ValueError("Unknown distribution '{0}'".format(distribution))
+
+
+def log_debug(msg, *args):
+    """Log msg formatted with args, indented by recursion depth.
+
+    Nothing is formatted unless debug logging is enabled.
+    """
+    if _debug_enabled():
+        logging.debug("{0}{1}".format('  '*num_tabs, msg.format(*args)))
+
+
+def _debug_enabled():
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
     
 
         
 if __name__ == '__main__':
+    import argparse
+    import tracemalloc
     import unittest
+    import unittest.mock
+
+    parser = argparse.ArgumentParser(
+        description='Run quicksort tests or an external sort of a file',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--external-sort', nargs=2, metavar=('INFILE', 'OUTFILE'),
+                       help='sort records of INFILE into OUTFILE')
+    parser.add_argument('--record-size', type=int,
+                        help='size in bytes of fixed-width records; newline-separated if omitted')
+    parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET,
+                        help='bytes of records to hold in memory at once')
+    parser.add_argument('--tmp-dir', help='directory for temporary run files')
+    parser.add_argument('--max-open-runs', type=int, default=DEFAULT_MAX_OPEN_RUNS,
+                        help='number of run files to merge at once')
+    args, unittest_args = parser.parse_known_args()
+
+    if args.external_sort:
+        external_sort(args.external_sort[0], args.external_sort[1],
+                      memory_budget=args.memory_budget, record_size=args.record_size,
+                      tmp_dir=args.tmp_dir, max_open_runs=args.max_open_runs)
+        sys.exit()
 
     class TestQuicksort(unittest.TestCase):
         def test_sanity(self):
@@ -116,8 +986,414 @@ if __name__ == '__main__':
             quicksort(items)
             self.assertEqual(['g'], items)
 
+    class TestIntrosort(unittest.TestCase):
+        size = 5000
+
+        def _run(self, items):
+            expected = sorted(items)
+            introsort(items)
+            self.assertEqual(expected, items)
+
+        def test_short(self):
+            self._run(['b', 'z', 'm', 'q', 'j', 'o'])
+
+        def test_empty(self):
+            self._run([])
+
+        def test_one_item(self):
+            self._run(['g'])
+
+        def test_random(self):
+            rand = random.Random(26)
+            self._run([rand.randint(0, 10**6) for _ in range(self.size)])
+
+        def test_sorted(self):
+            """Verify sorted input does not exhaust recursion limit.
+            """
+            self._run(list(range(self.size)))
+
+        def test_reverse_sorted(self):
+            self._run(list(range(self.size, 0, -1)))
+
+        def test_organ_pipe(self):
+            half = self.size // 2
+            self._run(list(range(half)) + list(range(half, 0, -1)))
+
+        def test_all_equal(self):
+            self._run([7] * self.size)
+
+        def test_few_distinct(self):
+            rand = random.Random(26)
+            self._run([rand.randint(0, 3) for _ in range(self.size)])
+
+        def test_range(self):
+            """Verify that only items between start_idx and end_idx are sorted.
+            """
+            items = [9, 8, 7, 6, 5, 4, 3, 2, 1]
+            introsort(items, start_idx=2, end_idx=6)
+            self.assertEqual([9, 8, 3, 4, 5, 6, 7, 2, 1], items)
+
+        def test_heapsort_fallback(self):
+            items = list(range(100, 0, -1))
+            _heapsort(items, 10, 89)
+            self.assertEqual(list(range(100, 90, -1)) + list(range(11, 91)) + list(range(10, 0, -1)),
+                             items)
+
+        def test_partition3(self):
+            items = [3, 1, 3, 5, 2, 3, 4]
+            lt, gt = partition3(items, 0, len(items)-1, 3)
+            self.assertEqual((2, 4), (lt, gt))
+            self.assertTrue(all(x < 3 for x in items[:lt]))
+            self.assertEqual([3, 3, 3], items[lt:gt+1])
+            self.assertTrue(all(x > 3 for x in items[gt+1:]))
+
+    class TestSelection(unittest.TestCase):
+        def setUp(self):
+            rand = random.Random(30)
+            self.items = [rand.randint(0, 500) for _ in range(1000)]
+
+        def test_quickselect(self):
+            expected = sorted(self.items)
+            for k in (0, 1, 250, 500, 999, -1):
+                items = list(self.items)
+                self.assertEqual(expected[k], quickselect(items, k))
+                self.assertEqual(sorted(self.items), sorted(items))
+                k = k % len(items)
+                self.assertTrue(all(x <= items[k] for x in items[:k]))
+                self.assertTrue(all(x >= items[k] for x in items[k+1:]))
+
+        def test_quickselect__out_of_range(self):
+            self.assertRaises(IndexError, quickselect, [], 0)
+            self.assertRaises(IndexError, quickselect, [1, 2], 2)
+
+        def test_quickselect__key(self):
+            """Verify key is called once per item and items themselves are not compared.
+            """
+            calls = []
+            def key(item):
+                calls.append(item)
+                return item['n']
+            items = [{'n': n} for n in (5, 3, 9, 1, 7)]
+            self.assertEqual({'n': 5}, quickselect(items, 2, key=key))
+            self.assertEqual(5, len(calls))
+
+        def test_partial_sort(self):
+            items = list(self.items)
+            partial_sort(items, 50)
+            self.assertEqual(sorted(self.items)[:50], items[:50])
+            self.assertEqual(sorted(self.items), sorted(items))
+
+        def test_nsmallest(self):
+            for k in (0, 1, 10, 1000, 2000):
+                self.assertEqual(heapq.nsmallest(k, self.items), nsmallest(k, self.items))
+
+        def test_nlargest(self):
+            for k in (0, 1, 10, 1000, 2000):
+                self.assertEqual(heapq.nlargest(k, self.items), nlargest(k, self.items))
+
+        def test_nsmallest__key(self):
+            """Verify ties keep their original order.
+            """
+            words = ['pear', 'fig', 'apple', 'kiwi', 'plum', 'banana']
+            self.assertEqual(['fig', 'pear', 'kiwi'], nsmallest(3, words, key=len))
+
+        def test_nlargest__key(self):
+            """Verify ties keep their original order, as with heapq.nlargest.
+            """
+            words = ['pear', 'fig', 'apple', 'kiwi', 'plum', 'banana']
+            self.assertEqual(['banana', 'apple', 'pear'], nlargest(3, words, key=len))
+            self.assertEqual(heapq.nlargest(4, words, key=len), nlargest(4, words, key=len))
+
+        def test_introsort__key(self):
+            words = ['pear', 'fig', 'apple', 'kiwi', 'plum', 'banana'] * 5
+            expected = sorted(words, key=len)
+            introsort(words, key=len)
+            self.assertEqual(expected, words)
+
+        def test_percentile(self):
+            self.assertEqual(1, percentile([3, 1, 2], 0))
+            self.assertEqual(3, percentile([3, 1, 2], 100))
+            self.assertEqual(1.75, percentile([4, 1, 2, 3], 25))
+            self.assertEqual(7, percentile([7], 50))
+
+        def test_percentile__invalid(self):
+            self.assertRaises(ValueError, percentile, [], 50)
+            self.assertRaises(ValueError, percentile, [1], 101)
+
+        def test_median(self):
+            self.assertEqual(2, median([3, 1, 2]))
+            self.assertEqual(2.5, median([4, 1, 3, 2]))
+            expected = sum(sorted(self.items)[499:501]) / 2.0
+            self.assertEqual(expected, median(self.items))
+
+    class TestParallelSort(unittest.TestCase):
+        size = PARALLEL_THRESHOLD + 1000
+
+        def _run(self, items, workers=2):
+            expected = sorted(items)
+            parallel_sort(items, workers=workers)
+            self.assertEqual(expected, items.tolist())
+
+        def test_random(self):
+            self._run(array.array('d', make_benchmark_data('random', self.size)))
+
+        def test_few_distinct(self):
+            self._run(array.array('d', make_benchmark_data('few_distinct', self.size)))
+
+        def test_all_equal(self):
+            self._run(array.array('i', [3] * self.size))
+
+        def test_small(self):
+            """Verify small buffer is sorted without starting workers.
+            """
+            self._run(array.array('i', [3, 1, 2]), workers=4)
+
+        def test_partition_ranges(self):
+            items = array.array('i', range(1000, 0, -1))
+            ranges = _partition_ranges(memoryview(items), 8)
+            self.assertEqual(8, len(ranges))
+            sizes = [hi - lo + 1 for lo, hi in ranges]
+            self.assertEqual(sorted(sizes, reverse=True), sizes)
+            for lo, hi in ranges:
+                # every item in a range belongs between the range boundaries
+                self.assertTrue(all(x >= min(items[lo:hi+1]) for x in items[hi+1:]))
+                self.assertTrue(all(x <= max(items[lo:hi+1]) for x in items[:lo]))
+
+        def test_nan(self):
+            items = array.array('d', make_benchmark_data('random', self.size))
+            items[5] = float('nan')
+            self.assertRaises(ValueError, parallel_sort, items, workers=2)
+
+        def test_shared_memory(self):
+            """Verify buffer already in shared memory is sorted where it is, without a copy.
+            """
+            items = array.array('d', make_benchmark_data('random', self.size))
+            shm = shared_memory.SharedMemory(create=True, size=(len(items) + 2) * items.itemsize)
+            try:
+                view = shm.buf.cast('d')[1:len(items)+1]
+                try:
+                    view[:] = items
+                    with unittest.mock.patch.object(shared_memory, 'SharedMemory',
+                                                    wraps=shared_memory.SharedMemory) as mock_shm:
+                        parallel_sort(view, workers=2, shm=shm)
+                    self.assertFalse(mock_shm.called)
+                    self.assertEqual(sorted(items), view.tolist())
+                finally:
+                    view.release()
+            finally:
+                shm.close()
+                shm.unlink()
+
+        def test_shared_memory__outside_block(self):
+            items = array.array('d', make_benchmark_data('random', self.size))
+            shm = shared_memory.SharedMemory(create=True, size=len(items) * items.itemsize)
+            try:
+                self.assertRaises(ValueError, parallel_sort, items, workers=2, shm=shm)
+            finally:
+                shm.close()
+                shm.unlink()
+
+    class TestExternalSort(unittest.TestCase):
+        def setUp(self):
+            self.tmp_dir = tempfile.mkdtemp()
+            self.infile = os.path.join(self.tmp_dir, 'in.txt')
+            self.outfile = os.path.join(self.tmp_dir, 'out.txt')
+
+        def tearDown(self):
+            shutil.rmtree(self.tmp_dir)
+
+        def _run(self, data, **kwargs):
+            with open(self.infile, 'wb') as fh:
+                fh.write(data)
+            external_sort(self.infile, self.outfile, tmp_dir=self.tmp_dir, **kwargs)
+            self.assertEqual(['in.txt', 'out.txt'], sorted(os.listdir(self.tmp_dir)))
+            with open(self.outfile, 'rb') as fh:
+                return fh.read()
+
+        def test_lines(self):
+            """Verify small memory budget spills many runs and merges them in order.
+            """
+            rand = random.Random(29)
+            lines = [str(rand.randint(0, 10**6)).encode() for _ in range(2000)]
+            result = self._run(b'\n'.join(lines) + b'\n', memory_budget=1024)
+            self.assertEqual(b''.join(line + b'\n' for line in sorted(lines)), result)
+
+        def test_multi_pass_merge(self):
+            """Verify more runs than max_open_runs are merged in several passes.
+            """
+            rand = random.Random(29)
+            lines = [str(rand.randint(0, 10**6)).encode() for _ in range(2000)]
+            result = self._run(b'\n'.join(lines), memory_budget=512, max_open_runs=3)
+            self.assertEqual(b''.join(line + b'\n' for line in sorted(lines)), result)
+
+        def test_multi_pass_merge__fixed_width(self):
+            rand = random.Random(29)
+            records = [bytes(rand.randint(0, 255) for _ in range(8)) for _ in range(500)]
+            result = self._run(b''.join(records), record_size=8, memory_budget=400,
+                               max_open_runs=2)
+            self.assertEqual(b''.join(sorted(records)), result)
+
+        def test_max_open_runs__invalid(self):
+            self.assertRaises(ValueError, self._run, b'a\n', max_open_runs=1)
+
+        def test_lines__no_trailing_newline(self):
+            self.assertEqual(b'a\nb\nc\n', self._run(b'c\na\nb', memory_budget=50))
+
+        def test_lines__empty_lines(self):
+            self.assertEqual(b'\n\na\n', self._run(b'a\n\n\n'))
+
+        def test_fixed_width(self):
+            rand = random.Random(29)
+            records = [bytes(rand.randint(0, 255) for _ in range(8)) for _ in range(1000)]
+            result = self._run(b''.join(records), record_size=8, memory_budget=2048)
+            self.assertEqual(b''.join(sorted(records)), result)
+
+        def test_fixed_width__partial_record(self):
+            self.assertRaises(ValueError, self._run, b'abcdefg', record_size=2)
+
+        def test_empty(self):
+            self.assertEqual(b'', self._run(b''))
+
+        def test_in_place(self):
+            """Verify sorting file onto itself.
+            """
+            with open(self.infile, 'wb') as fh:
+                fh.write(b'b\nc\na\n')
+            external_sort(self.infile, self.infile, memory_budget=50, tmp_dir=self.tmp_dir)
+            with open(self.infile, 'rb') as fh:
+                self.assertEqual(b'a\nb\nc\n', fh.read())
+
+        def test_in_place__interrupted(self):
+            """Verify input is left unchanged when sorting file onto itself fails during merge.
+            """
+            data = b''.join(b'%05d\n' % i for i in range(5000, 0, -1))
+            with open(self.infile, 'wb') as fh:
+                fh.write(data)
+            merge = heapq.merge
+            def interrupted_merge(*runs):
+                for i, record in enumerate(merge(*runs)):
+                    if i == 100:
+                        raise KeyboardInterrupt
+                    yield record
+            with unittest.mock.patch.object(heapq, 'merge', interrupted_merge):
+                self.assertRaises(KeyboardInterrupt, external_sort, self.infile, self.infile,
+                                  memory_budget=2048, tmp_dir=self.tmp_dir)
+            self.assertEqual(['in.txt'], os.listdir(self.tmp_dir))
+            with open(self.infile, 'rb') as fh:
+                self.assertEqual(data, fh.read())
+
+    class TestSortBuffer(unittest.TestCase):
+        def test_array(self):
+            rand = random.Random(27)
+            items = array.array('i', [rand.randint(-1000, 1000) for _ in range(2000)])
+            expected = sorted(items)
+            sort_buffer(items)
+            self.assertEqual(expected, items.tolist())
+
+        def test_array__float(self):
+            items = array.array('d', make_benchmark_data('organ_pipe', 1000))
+            expected = sorted(items)
+            sort_buffer(items)
+            self.assertEqual(expected, items.tolist())
+
+        def test_bytearray(self):
+            items = bytearray(b'quicksort')
+            sort_buffer(items)
+            self.assertEqual(bytearray(b'cikoqrstu'), items)
+
+        def test_memoryview_slice(self):
+            """Verify sorting memoryview slice reorders only that part of underlying array.
+            """
+            items = array.array('h', [9, 8, 7, 6, 5, 4, 3, 2, 1])
+            sort_buffer(memoryview(items)[2:7])
+            self.assertEqual([9, 8, 3, 4, 5, 6, 7, 2, 1], items.tolist())
+
+        def test_range(self):
+            items = array.array('h', [9, 8, 7, 6, 5, 4, 3, 2, 1])
+            sort_buffer(items, start_idx=2, end_idx=6)
+            self.assertEqual([9, 8, 3, 4, 5, 6, 7, 2, 1], items.tolist())
+
+        def test_2d(self):
+            """Verify C-contiguous 2-D buffer is sorted as flat sequence.
+            """
+            items = array.array('l', [4, 3, 2, 1, 0, 5])
+            sort_buffer(memoryview(items).cast('B').cast('l', [2, 3]))
+            self.assertEqual([0, 1, 2, 3, 4, 5], items.tolist())
+
+        def test_empty(self):
+            items = array.array('d')
+            sort_buffer(items)
+            self.assertEqual(0, len(items))
+
+        def test_readonly(self):
+            self.assertRaises(TypeError, sort_buffer, b'readonly')
+
+        def test_nan(self):
+            items = array.array('d', [1.0, float('nan'), 0.0])
+            self.assertRaises(ValueError, sort_buffer, items)
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_numpy(self):
+            for distribution in BENCHMARK_DISTRIBUTIONS:
+                items = numpy.array(make_benchmark_data(distribution, 3 * NUMPY_PARTITION_THRESHOLD))
+                expected = numpy.sort(items)
+                sort_buffer(items)
+                self.assertTrue((expected == items).all(), distribution)
+
+        def test_signed_zero(self):
+            """Verify items equal to pivot keep their own values.
+            """
+            items = array.array('d', [0.0, -0.0] * 400)
+            sort_buffer(items)
+            self.assertEqual(400, sum(math.copysign(1, x) < 0 for x in items))
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_numpy__non_native_byte_order(self):
+            for size in (10, 2 * NUMPY_PARTITION_THRESHOLD):
+                items = numpy.arange(size, 0, -1, dtype='>f8')
+                self.assertRaises(TypeError, sort_buffer, items)
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_numpy__float16(self):
+            self.assertRaises(TypeError, sort_buffer, numpy.zeros(10, dtype='float16'))
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_numpy__signed_zero(self):
+            items = numpy.array([0.0, -0.0] * 400)
+            sort_buffer(items)
+            self.assertEqual(400, numpy.signbit(items).sum())
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_parallel_sort__signed_zero(self):
+            items = numpy.array([0.0, -0.0, 1.0] * PARALLEL_THRESHOLD)
+            parallel_sort(items, workers=2)
+            self.assertEqual(PARALLEL_THRESHOLD, numpy.signbit(items).sum())
+            self.assertTrue((numpy.diff(items) >= 0).all())
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_numpy__peak_memory(self):
+            """Verify partitioning and NaN check allocate far less than the buffer itself.
+            """
+            items = numpy.array(make_benchmark_data('random', 8 * NUMPY_BLOCK_SIZE))
+            tracemalloc.start()
+            try:
+                _check_no_nan(memoryview(items), items, 0, len(items)-1)
+                pivot_val = items[_choose_pivot(items, 0, len(items)-1)]
+                _numpy_partition3(items, 0, len(items)-1, pivot_val)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, items.nbytes // 4)
+
+        @unittest.skipIf(numpy is None, "numpy not installed")
+        def test_numpy__strided(self):
+            items = numpy.arange(2 * NUMPY_PARTITION_THRESHOLD, 0, -1)
+            sort_buffer(items[::2])
+            self.assertTrue((numpy.sort(items[::2]) == items[::2]).all())
+            self.assertTrue((items[1::2] == numpy.arange(2 * NUMPY_PARTITION_THRESHOLD - 1, 0, -2)).all())
+
     # set logging to DEBUG
     logging.basicConfig(level=logging.DEBUG)
 
     # run tests
-    unittest.main()
+    unittest.main(argv=sys.argv[:1] + unittest_args)
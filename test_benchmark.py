@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for benchmark harness.
+"""
+
+import unittest
+
+import benchmark
+from benchmark import Workload
+
+
+class DiscoverWorkloadsTests(unittest.TestCase):
+    """Exercise workload discovery across algorithm modules.
+    """
+
+    def test_all_modules(self):
+        """Verify every module contributes workloads with unique names.
+        """
+        workloads = benchmark.discover_workloads()
+        self.assertEqual(set(benchmark.MODULE_NAMES), set(w.module for w in workloads))
+        names = [benchmark.full_name(w) for w in workloads]
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_name_filter(self):
+        workloads = benchmark.discover_workloads(name_filter='qsort.introsort/')
+        self.assertTrue(workloads)
+        self.assertTrue(all(w.module == 'qsort' and w.name.startswith('introsort/')
+                            for w in workloads))
+
+    def test_module_without_workloads(self):
+        """Verify modules without benchmark_workloads are skipped.
+        """
+        self.assertEqual([], benchmark.discover_workloads(['logging_for_recursion']))
+
+
+class RunWorkloadTests(unittest.TestCase):
+    """Exercise measurement of a single workload.
+    """
+
+    def setUp(self):
+        self.calls = []
+        self.workload = Workload('module', 'name', lambda: [3, 1, 2], self.calls.append)
+
+    def test_run_workload(self):
+        """Verify warmup and repeat counts and result fields.
+        """
+        result = benchmark.run_workload(self.workload, warmup=2, repeat=3, profile_top=1)
+        self.assertEqual('module.name', result['name'])
+        self.assertEqual(3, result['repeat'])
+        self.assertTrue(0 <= result['min'] <= result['median'])
+        self.assertTrue(result['peak_bytes'] >= 0)
+        self.assertEqual(1, len(result['hot_spots']))
+        # warmup, timed, tracemalloc and cProfile runs each get a fresh input
+        self.assertEqual([[3, 1, 2]] * 7, self.calls)
+
+    def test_run_workload__no_memory(self):
+        result = benchmark.run_workload(self.workload, warmup=0, repeat=1, measure_memory=False)
+        self.assertNotIn('peak_bytes', result)
+        self.assertNotIn('hot_spots', result)
+        self.assertEqual(1, len(self.calls))
+
+    def test_run_all(self):
+        seen = []
+        report = benchmark.run_all([self.workload] * 2, on_result=seen.append, repeat=1)
+        self.assertEqual(seen, report['results'])
+        self.assertIn('python', report)
+
+
+class CompareTests(unittest.TestCase):
+    """Exercise baseline comparison.
+    """
+
+    def _report(self, **times):
+        return {'results': [{'name': name, 'min': time} for name, time in times.items()]}
+
+    def test_compare(self):
+        baseline = self._report(fast=1.0, slow=1.0, gone=1.0)
+        report = self._report(fast=1.1, slow=1.5, new=9.0)
+        self.assertEqual([('slow', 1.0, 1.5)], benchmark.compare(report, baseline, threshold=0.2))
+
+    def test_compare__no_regressions(self):
+        baseline = self._report(a=1.0)
+        self.assertEqual([], benchmark.compare(self._report(a=0.5), baseline))
+
+
+if __name__ == '__main__':
+    unittest.main()